@@ -0,0 +1,129 @@
+"""
+Startup benchmark of the pytest-selenium-auto plugin, based on ``python -X importtime``.
+
+Measures the import time of the plugin module, as loaded by pytest at every invocation,
+and lists the modules it imports. With --check, fails if the plugin imports Selenium
+webdriver modules, PyYAML or Pillow at load time, or if a browser pulls the modules of another browser.
+
+Usage:
+
+    python benchmarks/bench_import.py [--runs 5] [--top 10] [--check] [--max-ms 100]
+"""
+import argparse
+import json
+import statistics
+import subprocess
+import sys
+
+
+# Modules that must not be imported when the plugin is loaded
+forbidden = (
+    "yaml",
+    "PIL",
+    "selenium.webdriver.remote.webdriver",
+    "selenium.webdriver.support",
+    "selenium.webdriver.common.service",
+    "selenium.webdriver.common.proxy",
+    "selenium.webdriver.firefox",
+)
+
+browsers = ("firefox", "chrome", "chromium", "edge", "safari")
+
+# Builds the options of a browser and prints the Selenium modules imported
+browser_script = """
+import json, sys
+from pytest_selenium_auto import configuration_loader
+from pytest_selenium_auto.browser_settings import browser_options
+plans = configuration_loader.compile_plans(configuration_loader.load_config(None))
+browser_options(plans[sys.argv[1]], {}, False)
+print(json.dumps(sorted(m for m in sys.modules if m.startswith("selenium.webdriver."))))
+"""
+
+
+def import_times(module):
+    """
+    Imports a module in a new interpreter.
+
+    Returns:
+        dict[str, tuple[int, int]]: The self and cumulative import times in microseconds of each imported module.
+    """
+    # pytest is already imported when pytest loads the plugin
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import pytest; import {module}"],
+        capture_output=True, text=True, check=True,
+    )
+    times = {}
+    after_pytest = False
+    for line in result.stderr.splitlines():
+        if not line.startswith("import time:") or "|" not in line:
+            continue
+        fields = line[len("import time:"):].split("|")
+        try:
+            self_time, cumulative = int(fields[0]), int(fields[1])
+        except ValueError:
+            continue
+        name = fields[2].strip()
+        if after_pytest:
+            times[name] = (self_time, cumulative)
+        after_pytest = after_pytest or name == "pytest"
+    return times
+
+
+def browser_modules(browser):
+    """ Returns the browser specific Selenium modules imported when building the options of a browser. """
+    result = subprocess.run(
+        [sys.executable, "-c", browser_script, browser],
+        capture_output=True, text=True, check=True,
+    )
+    modules = [m.split(".") for m in json.loads(result.stdout)]
+    return sorted(".".join(m[2:4]) for m in modules if len(m) > 3 and m[2] in browsers)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Startup benchmark of the pytest-selenium-auto plugin.")
+    parser.add_argument("--module", default="pytest_selenium_auto.plugin",
+                        help="Module to import.")
+    parser.add_argument("--runs", type=int, default=5,
+                        help="Number of measures. The median is reported.")
+    parser.add_argument("--top", type=int, default=10,
+                        help="Number of slowest modules to list.")
+    parser.add_argument("--check", action="store_true",
+                        help="Fail if forbidden modules are imported at plugin load.")
+    parser.add_argument("--max-ms", type=float, default=0,
+                        help="Fail if the plugin import time exceeds this value in milliseconds. 0 means no limit.")
+    args = parser.parse_args(argv)
+
+    measures = [import_times(args.module) for _ in range(args.runs)]
+    total = statistics.median(m[args.module][1] for m in measures if args.module in m)
+    last = measures[-1]
+    print(f"{args.module}: {total / 1000:.1f}ms (median of {args.runs} runs), {len(last)} modules imported")
+    print(f"\n{'self':>10} {'cumulative':>11}  module")
+    for name, (self_time, cumulative) in sorted(last.items(), key=lambda item: item[1][0], reverse=True)[:args.top]:
+        print(f"{self_time / 1000:>8.1f}ms {cumulative / 1000:>9.1f}ms  {name}")
+
+    errors = []
+    imported = [name for name in last if name.startswith(forbidden)]
+    for name in imported:
+        errors.append(f"{name} is imported when the plugin is loaded")
+
+    print("\nBrowser specific Selenium modules imported per browser:")
+    for browser in browsers:
+        modules = browser_modules(browser)
+        print(f"  {browser:<9} {', '.join(modules)}")
+        # Chrome and Edge classes extend the Chromium ones
+        allowed = (browser, "chromium") if browser in ("chrome", "edge") else (browser,)
+        for module in modules:
+            if module.split(".")[0] not in allowed and module.split(".")[1] in ("options", "service", "webdriver", "firefox_profile"):
+                errors.append(f"selenium.webdriver.{module} is imported by the {browser} browser")
+
+    if args.max_ms > 0 and total / 1000 > args.max_ms:
+        errors.append(f"The plugin import time exceeds {args.max_ms}ms")
+
+    if args.check and len(errors) > 0:
+        print("\n" + "\n".join(errors), file=sys.stderr)
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,158 @@
+"""
+Benchmark of the pytest-selenium-auto hot paths against a mock WebDriver server.
+
+Measures, for tests of 10, 100 and 1000 steps:
+  * the overhead per webdriver event added by the event listener,
+    compared with the same steps run on an unwrapped webdriver.
+  * the HTML report generation time.
+  * the number of bytes of screenshots and page sources written.
+
+Usage:
+
+    python benchmarks/bench_plugin.py [--steps 10 100 1000] [--latency 0.001] [--json results.json]
+"""
+import argparse
+import json
+import os
+import shutil
+import sys
+import tempfile
+import time
+
+from selenium import webdriver
+from selenium.webdriver.common.by import By
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+from mock_webdriver import MockWebDriverServer  # noqa: E402
+
+from pytest_selenium_auto import utils  # noqa: E402
+from pytest_selenium_auto.artifact_writer import ArtifactWriter  # noqa: E402
+from pytest_selenium_auto.listener import CustomEventListener  # noqa: E402
+from pytest_selenium_auto.wrappers import CustomEventFiringWebDriver, wrap_driver  # noqa: E402
+
+
+def run_steps(driver, steps, pages):
+    """ Runs a test of the given number of steps: navigations, clicks and text inputs. """
+    for i in range(steps):
+        action = i % 3
+        if action == 0:
+            driver.get(f"http://mock.test/page{i % pages}")
+        elif action == 1:
+            driver.find_element(By.ID, f"button{i}").click()
+        else:
+            driver.find_element(By.NAME, f"field{i}").send_keys("text")
+
+
+def build_report(images, sources, comments):
+    """ Builds the HTML extras of a test, as done in pytest_runtest_makereport. """
+    rows = "".join(utils.append_table_rows([], comments, images, sources))
+    links = "".join(utils.append_anchors([], images, sources))
+    return rows, links
+
+
+def get_folder_size(folder):
+    """ Returns the number of files and bytes in a folder. """
+    files = 0
+    size = 0
+    for root, _, filenames in os.walk(folder):
+        for filename in filenames:
+            files += 1
+            size += os.path.getsize(os.path.join(root, filename))
+    return files, size
+
+
+def new_driver(server):
+    return webdriver.Remote(command_executor=server.url, options=webdriver.ChromeOptions())
+
+
+def bench_baseline(server, steps, pages):
+    """ Returns the duration of the test steps on an unwrapped webdriver. """
+    driver = new_driver(server)
+    try:
+        start = time.perf_counter()
+        run_steps(driver, steps, pages)
+        return time.perf_counter() - start
+    finally:
+        driver.quit()
+
+
+def bench_plugin(server, steps, pages, writer_threads):
+    """ Returns the measures of the test steps on a webdriver wrapped by the plugin. """
+    report_folder = tempfile.mkdtemp(prefix="selenium-bench-")
+    writer = ArtifactWriter(threads=writer_threads)
+    images, sources, comments = [], [], []
+    driver = new_driver(server)
+    try:
+        wrap_driver(driver, "all", images, sources, comments, report_folder,
+                    log_attributes=True, log_page_source=True, writer=writer)
+        event_driver = CustomEventFiringWebDriver(driver, CustomEventListener())
+        commands = server.commands
+        start = time.perf_counter()
+        run_steps(event_driver, steps, pages)
+        # The artifacts are part of the cost of the steps
+        utils.flush_artifacts(driver)
+        writer.drain()
+        duration = time.perf_counter() - start
+        commands = server.commands - commands
+
+        start = time.perf_counter()
+        rows, links = build_report(images, sources, comments)
+        report_time = time.perf_counter() - start
+
+        files, size = get_folder_size(report_folder)
+        return {
+            'duration': duration,
+            'commands': commands,
+            'plugin_commands': driver.plugin_commands,
+            'report_time': report_time,
+            'report_bytes': len(rows) + len(links),
+            'artifact_files': files,
+            'artifact_bytes': size,
+        }
+    finally:
+        driver.quit()
+        writer.close()
+        shutil.rmtree(report_folder, ignore_errors=True)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark of the pytest-selenium-auto hot paths.")
+    parser.add_argument("--steps", type=int, nargs="+", default=[10, 100, 1000],
+                        help="Number of steps of the benchmarked tests.")
+    parser.add_argument("--latency", type=float, default=0.0,
+                        help="Latency in seconds of the mock WebDriver server commands.")
+    parser.add_argument("--pages", type=int, default=5,
+                        help="Number of distinct pages served by the mock WebDriver server.")
+    parser.add_argument("--writer-threads", type=int, default=2,
+                        help="Number of artifact writer threads. 0 means synchronous writes.")
+    parser.add_argument("--json", default=None,
+                        help="File to write the results to, in JSON format.")
+    args = parser.parse_args(argv)
+
+    results = []
+    with MockWebDriverServer(latency=args.latency, pages=args.pages) as server:
+        for steps in args.steps:
+            baseline = bench_baseline(server, steps, args.pages)
+            measures = bench_plugin(server, steps, args.pages, args.writer_threads)
+            measures['steps'] = steps
+            measures['baseline'] = baseline
+            measures['overhead_per_event'] = (measures['duration'] - baseline) / steps
+            results.append(measures)
+
+    header = f"{'steps':>6} {'baseline':>10} {'plugin':>10} {'per event':>11} {'commands':>9} " \
+             f"{'report':>9} {'files':>6} {'artifacts':>12}"
+    print(header)
+    for r in results:
+        print(
+            f"{r['steps']:>6} {r['baseline']:>9.3f}s {r['duration']:>9.3f}s "
+            f"{r['overhead_per_event'] * 1000:>8.2f}ms {r['plugin_commands']:>9} "
+            f"{r['report_time'] * 1000:>7.2f}ms {r['artifact_files']:>6} {r['artifact_bytes']:>12,}"
+        )
+    if args.json is not None:
+        f = open(args.json, 'w', encoding="utf-8")
+        json.dump(results, f, indent=2)
+        f.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,264 @@
+"""
+In-process stand-in for a W3C WebDriver server.
+
+Implements the endpoints used by pytest-selenium-auto (session, navigation, element
+lookup and interaction, scripts, screenshots and page sources) and returns canned
+PNG images and DOMs after a configurable latency.
+
+Usage:
+
+    server = MockWebDriverServer(latency=0.005)
+    server.start()
+    driver = selenium.webdriver.Remote(command_executor=server.url, options=ChromeOptions())
+    ...
+    driver.quit()
+    server.stop()
+"""
+import base64
+import json
+import re
+import struct
+import threading
+import time
+import uuid
+import zlib
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+
+# W3C web element identifier
+ELEMENT_KEY = "element-6066-11e4-a52e-4f735466cecf"
+
+
+def make_png(width=1280, height=800, seed=0):
+    """ Returns a solid color PNG image. The color depends on the seed. """
+    color = bytes(((seed * 37) % 256, (seed * 91) % 256, (seed * 173) % 256))
+    row = b"\x00" + color * width
+    raw = row * height
+
+    def chunk(kind, data):
+        content = kind + data
+        return struct.pack(">I", len(data)) + content + struct.pack(">I", zlib.crc32(content) & 0xFFFFFFFF)
+
+    header = struct.pack(">IIBBBBB", width, height, 8, 2, 0, 0, 0)
+    return (
+        b"\x89PNG\r\n\x1a\n"
+        + chunk(b"IHDR", header)
+        + chunk(b"IDAT", zlib.compress(raw, 6))
+        + chunk(b"IEND", b"")
+    )
+
+
+def make_dom(size=50_000, seed=0):
+    """ Returns an HTML document of approximately the given size in bytes. """
+    row = f'<tr><td class="cell">row {seed}</td><td><input type="text" name="field" value="{seed}"></td></tr>\n'
+    rows = row * max(size // len(row), 1)
+    return f"<html><head><title>Page {seed}</title></head><body><table>\n{rows}</table></body></html>"
+
+
+class _Session:
+
+    def __init__(self, pages):
+        self.url = "about:blank"
+        self.history = [self.url]
+        self.position = 0
+        self.pages = pages
+        self.elements = {}
+        self.window = str(uuid.uuid4())
+
+    def page(self):
+        return hash(self.url) % self.pages
+
+    def element(self, using, value):
+        element_id = str(uuid.uuid4())
+        self.elements[element_id] = {
+            'tag': "input",
+            'name': value,
+            'value': "",
+            'selected': False,
+        }
+        return {ELEMENT_KEY: element_id}
+
+
+class MockWebDriverServer:
+    """
+    Local W3C WebDriver server returning canned responses.
+
+    Args:
+        latency (float): Delay in seconds added to every command.
+
+        pages (int): Number of distinct pages (screenshots and DOMs) served.
+
+        dom_size (int): Approximate size in bytes of the page sources.
+
+        image_size (tuple[int, int]): Width and height of the screenshots.
+    """
+
+    def __init__(self, latency=0.0, pages=5, dom_size=50_000, image_size=(1280, 800), host="127.0.0.1", port=0):
+        self.latency = latency
+        self.pages = pages
+        self.commands = 0
+        self.sessions = {}
+        self.screenshots = [base64.b64encode(make_png(*image_size, seed=i)).decode() for i in range(pages)]
+        self.sources = [make_dom(dom_size, seed=i) for i in range(pages)]
+        self._server = ThreadingHTTPServer((host, port), self._handler())
+        self._server.daemon_threads = True
+        self._thread = None
+
+    @property
+    def url(self):
+        host, port = self._server.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def start(self):
+        self._thread = threading.Thread(target=self._server.serve_forever, name="mock-webdriver", daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._server.shutdown()
+        self._server.server_close()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *args):
+        self.stop()
+
+    def _handler(self):
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+            # Headers and body are sent in separate writes
+            disable_nagle_algorithm = True
+
+            def log_message(self, *args):
+                pass
+
+            def do_GET(self):
+                self._dispatch("GET")
+
+            def do_POST(self):
+                self._dispatch("POST")
+
+            def do_DELETE(self):
+                self._dispatch("DELETE")
+
+            def _dispatch(self, method):
+                length = int(self.headers.get("Content-Length", 0))
+                body = self.rfile.read(length) if length > 0 else b""
+                params = json.loads(body) if body else {}
+                server.commands += 1
+                if server.latency > 0:
+                    time.sleep(server.latency)
+                status, value = server._route(method, self.path, params)
+                payload = json.dumps({'value': value}).encode("utf-8")
+                self.send_response(status)
+                self.send_header("Content-Type", "application/json; charset=utf-8")
+                self.send_header("Content-Length", str(len(payload)))
+                self.end_headers()
+                self.wfile.write(payload)
+
+        return Handler
+
+    def _route(self, method, path, params):
+        if method == "POST" and path == "/session":
+            session_id = str(uuid.uuid4())
+            self.sessions[session_id] = _Session(self.pages)
+            capabilities = {
+                'browserName': "chrome",
+                'browserVersion': "mock",
+                'platformName': "any",
+                'acceptInsecureCerts': False,
+                'pageLoadStrategy': "normal",
+                'timeouts': {'implicit': 0, 'pageLoad': 300000, 'script': 30000},
+            }
+            return 200, {'sessionId': session_id, 'capabilities': capabilities}
+
+        match = re.match(r"^/session/([^/]+)(/.*)?$", path)
+        if match is None or match.group(1) not in self.sessions:
+            return 404, {'error': "invalid session id", 'message': path, 'stacktrace': ""}
+        session = self.sessions[match.group(1)]
+        command = match.group(2) or ""
+
+        if command == "" and method == "DELETE":
+            del self.sessions[match.group(1)]
+            return 200, None
+        if command == "/url":
+            if method == "POST":
+                session.url = params.get('url', "about:blank")
+                session.history = session.history[:session.position + 1] + [session.url]
+                session.position += 1
+                return 200, None
+            return 200, session.url
+        if command in ("/back", "/forward"):
+            step = -1 if command == "/back" else 1
+            session.position = min(max(session.position + step, 0), len(session.history) - 1)
+            session.url = session.history[session.position]
+            return 200, None
+        if command == "/screenshot":
+            return 200, self.screenshots[session.page()]
+        if command == "/source":
+            return 200, self.sources[session.page()]
+        if command == "/window/handles":
+            return 200, [session.window]
+        if command == "/window":
+            return 200, session.window if method == "GET" else None
+        if command in ("/element", "/elements") or re.match(r"^/element/[^/]+/elements?$", command):
+            element = session.element(params.get('using'), params.get('value'))
+            if command.endswith("/elements"):
+                return 200, [element, session.element(params.get('using'), params.get('value'))]
+            return 200, element
+        if command in ("/execute/sync", "/execute/async"):
+            return 200, self._execute(session, params.get('script', ""), params.get('args', []))
+
+        match = re.match(r"^/element/([^/]+)/(\w+)(?:/(.+))?$", command)
+        if match is not None:
+            element = session.elements.get(match.group(1))
+            if element is None:
+                return 404, {'error': "no such element", 'message': command, 'stacktrace': ""}
+            action = match.group(2)
+            if action == "click":
+                element['selected'] = not element['selected']
+                return 200, None
+            if action == "value":
+                element['value'] += params.get('text', "")
+                return 200, None
+            if action == "clear":
+                element['value'] = ""
+                return 200, None
+            if action == "name":
+                return 200, element['tag']
+            if action == "text":
+                return 200, f"text of {element['name']}"
+            if action == "selected":
+                return 200, element['selected']
+            if action in ("attribute", "property"):
+                return 200, element.get(match.group(3))
+            return 200, None
+
+        # Timeouts, cookies, window rect, etc.
+        return 200, None
+
+    def _execute(self, session, script, args):
+        elements = [session.elements.get(arg[ELEMENT_KEY]) for arg in args if isinstance(arg, dict) and ELEMENT_KEY in arg]
+        if len(elements) == 0 or elements[0] is None:
+            return None
+        element = elements[0]
+        # pytest-selenium-auto attributes script
+        if "innerText" in script:
+            return {
+                'tag': element['tag'],
+                'id': None,
+                'name': element['name'],
+                'type': "text",
+                'value': element['value'],
+                'checked': element['selected'],
+                'class': None,
+                'href': None,
+                'text': f"text of {element['name']}",
+            }
+        # Selenium getAttribute atom
+        if "getAttribute" in script and len(args) > 1:
+            return element.get(args[1])
+        return None
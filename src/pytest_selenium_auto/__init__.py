@@ -1,10 +1,17 @@
-from .wrappers import CustomSelect as Select
-
 __all__ = ["Select"]
 
+
+def __getattr__(name):
+    # Selenium is only imported when the Select wrapper is used
+    if name == "Select":
+        from .wrappers import CustomSelect
+        return CustomSelect
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+
 supported_browsers = ("firefox", "chrome", "chromium", "edge", "safari")
 
-screenshot_strategies = ("all", "failed", "last", "manual", "none")
+screenshot_strategies = ("all", "buffer", "failed", "last", "manual", "none")
 
 # Action keywords for select and checkbox webelements.
 action_keywords = {
@@ -0,0 +1,76 @@
+import queue
+import sys
+import threading
+import traceback
+
+
+class ArtifactWriter:
+    """
+    Bounded background writer of screenshots and page sources.
+
+    The test thread only submits the captured data and the destination filename.
+    The decoding and the file writes are done by a pool of threads.
+    When the queue is full, the test thread waits for a free slot.
+    """
+
+    def __init__(self, threads=2, queue_size=32):
+        """
+        Args:
+            threads (int): Number of writer threads. 0 means synchronous writes.
+
+            queue_size (int): Maximum number of pending writes.
+        """
+        self.failed = set()
+        self._queue = queue.Queue(maxsize=max(queue_size, 1))
+        self._threads = []
+        for i in range(threads):
+            thread = threading.Thread(target=self._run, name=f"selenium-writer-{i}", daemon=True)
+            thread.start()
+            self._threads.append(thread)
+
+    def submit(self, link, func, *args):
+        """
+        Schedules a write.
+
+        Args:
+            link (str): The filename for the anchor link of the artifact.
+
+            func (callable): The function performing the write.
+
+            args: The arguments of the function.
+        """
+        if len(self._threads) == 0:
+            self._write(link, func, args)
+        else:
+            self._queue.put((link, func, args))
+
+    def drain(self):
+        """ Waits for all pending writes to complete. """
+        if len(self._threads) > 0:
+            self._queue.join()
+
+    def close(self):
+        """ Waits for all pending writes to complete and stops the writer threads. """
+        for _ in self._threads:
+            self._queue.put(None)
+        for thread in self._threads:
+            thread.join()
+        self._threads = []
+
+    def _run(self):
+        while True:
+            task = self._queue.get()
+            try:
+                if task is None:
+                    break
+                self._write(*task)
+            finally:
+                self._queue.task_done()
+
+    def _write(self, link, func, args):
+        try:
+            func(*args)
+        except Exception as e:
+            trace = traceback.format_exc()
+            self.failed.add(link)
+            print(f"{str(e)}\n\n{trace}", file=sys.stderr)
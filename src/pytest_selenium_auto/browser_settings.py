@@ -1,85 +1,231 @@
-from selenium.webdriver.chrome.service import Service as Service_Chrome
-from selenium.webdriver.chromium.service import ChromiumService as Service_Chromium
-from selenium.webdriver.firefox.service import Service as Service_Firefox
-from selenium.webdriver.edge.service import Service as Service_Edge
-from selenium.webdriver.safari.service import Service as Service_Safari
+import copy
+import hashlib
+import json
+import os
+import threading
 from .configuration_loader import (
+    get_browser_class,
     get_options,
     get_service,
 )
+from . import utils
 
 
-services = {
-    'firefox':  Service_Firefox,
-    'chrome':   Service_Chrome,
-    'chromium': Service_Chromium,
-    'edge':     Service_Edge,
-    'safari':   Service_Safari,
-}
+# Ready-made browser options, by effective configuration
+_options = {}
 
+# Driver and browser binary paths resolved by Selenium Manager, by browser settings
+_binary_paths = {}
+_binary_paths_lock = threading.Lock()
 
-def browser_options(browser, config, headless):
+# Key prefix of the resolved binary paths in the pytest cache.
+# Each browser settings key has its own cache entry, so that pytest-xdist workers don't overwrite each other.
+binary_paths_cache_key = "pytest_selenium_auto/binary_paths"
+
+
+def get_options_key(plan, window, headless):
+    """
+    Returns the key identifying the effective configuration of the browser options.
+
+    Args:
+        plan (BrowserPlan): The webdriver configuration of the browser.
+
+        window (dict): The window settings.
+
+        headless (bool): The 'headless' INI option value.
+
+    Returns:
+        str: The options key.
+    """
+    return json.dumps(
+        [utils.thaw(plan), headless is True, window.get('headless')],
+        sort_keys=True,
+        default=str
+    )
+
+
+def browser_options(plan, window, headless):
     """
     Loads browser options from plugin options and JSON/YAML webdriver configuration.
     
     Args:
-        browser (str): The 'browser' command-line option value.
+        plan (BrowserPlan): The webdriver configuration of the browser, or None if no browser is set.
         
-        config (dict): The webdriver configuration loaded from JSON/YAML file.
+        window (dict): The window settings.
 
         headless (bool): The 'headless' INI option value.
         
     Returns:
         selenium.webdriver.<browser>.options.Options: The options instance.
     """
-    if browser is None:
+    if plan is None:
         return None
 
-    options = get_options(browser, config)
-    # window = markers.get_marker_window(request.node)
-    if (
-        headless is True or
-        (
-            'window' in config and
-            'headless' in config['window'] and
-            config['window']['headless'] is True
-        )
-    ):
-        options.add_argument("--headless")
-    # options.update(markers.get_marker_options(request.node))
-    return options
-
-
-def browser_service(browser, config, driver_paths):
+    key = get_options_key(plan, window, headless)
+    options = _options.get(key)
+    if options is None:
+        options = get_options(plan, window)
+        if (
+            headless is True or
+            ('headless' in window and window['headless'] is True)
+        ):
+            options.add_argument("--headless")
+        _options[key] = options
+    # Each test gets its own copy of the options
+    return copy.deepcopy(options)
+
+
+def browser_service(plan, driver_paths):
     """
     Loads browser service from plugin options and JSON/YAML webdriver configuration.
     
     Args:
-        browser (str): The 'browser' command-line option value.
-        
-        config (dict): The webdriver configuration loaded from JSON/YAML file.
+        plan (BrowserPlan): The webdriver configuration of the browser, or None if no browser is set.
 
         driver_paths (dict[str,str]): The webdriver filepath INI option values.
         
     Returns:
         selenium.webdriver.<browser>.service.Service: The service instance.
     """
-    config_service = {}
-    if (
-        'browsers' in config and
-        browser in config['browsers'] and
-        'service' in config['browsers'][browser]
-    ):
-        config_service = config['browsers'][browser]['service']
-    if browser is None:
+    if plan is None:
         return None
+    browser = plan.browser
+    config_service = plan.service
     # When driver configuration provided in pytest.ini file
-    if driver_paths[browser] is not None and config_service == {}:
-        return services[browser](executable_path=driver_paths[browser])
+    if driver_paths[browser] is not None and len(config_service) == 0:
+        return get_browser_class(browser, 'service')(executable_path=driver_paths[browser])
     # When driver configuration provided in JSON file
-    elif config_service != {}:
+    elif len(config_service) > 0:
         if driver_paths[browser] is not None:
-            config_service['driver_path'] = driver_paths[browser]
+            config_service = {**config_service, 'driver_path': driver_paths[browser]}
         return get_service(browser, config_service)
     else:
-        return services[browser]()
+        return get_browser_class(browser, 'service')()
+
+
+def get_service_key(plan, options, driver_paths):
+    """
+    Returns the key identifying the services that can be shared between tests:
+    the browser, the service configuration, the driver path option
+    and the browser settings used to resolve the driver path.
+    The key is computed without building the service.
+    """
+    return json.dumps(
+        [plan.browser, utils.thaw(plan.service), driver_paths[plan.browser], get_binary_paths_key(plan.browser, options)],
+        sort_keys=True, default=str
+    )
+
+
+def get_binary_paths_key(browser, options):
+    """
+    Returns the key identifying the browser settings used by Selenium Manager to resolve the binary paths:
+    the browser name and version, the browser binary location and the proxy.
+    """
+    proxy = options.proxy
+    return json.dumps([
+        browser,
+        options.browser_version,
+        getattr(options, "binary_location", None),
+        (proxy.ssl_proxy or proxy.http_proxy) if proxy is not None else None,
+    ])
+
+
+@utils.try_catch_wrap_driver("Error resolving the driver and browser paths.")
+def resolve_binary_paths(browser, options, cache=None):
+    """
+    Returns the driver and browser binary paths of a browser.
+    The paths are resolved by Selenium Manager once per session and, if a pytest cache is provided,
+    once per installed browser binary: the cached paths are resolved again when the browser binary changes.
+
+    Args:
+        browser (str): The browser name.
+
+        options (selenium.webdriver.<browser>.options.Options): The browser options.
+
+        cache (Cache): The pytest cache, or None.
+
+    Returns:
+        dict[str, str]: The 'driver_path' and 'browser_path' values,
+            or None if the Selenium version can't resolve the paths before the webdriver starts.
+    """
+    key = get_binary_paths_key(browser, options)
+    with _binary_paths_lock:
+        if key in _binary_paths:
+            return _binary_paths[key]
+        paths = None
+        cache_key = f"{binary_paths_cache_key}/{hashlib.sha1(key.encode('utf-8')).hexdigest()}"
+        entry = cache.get(cache_key, None) if cache is not None else None
+        if _is_valid_cache_entry(entry, key):
+            paths = entry['paths']
+        if paths is None:
+            from selenium.webdriver.common.driver_finder import DriverFinder
+            # Older Selenium versions only resolve the paths when the webdriver starts
+            if hasattr(DriverFinder, "get_driver_path") and hasattr(DriverFinder, "get_browser_path"):
+                finder = DriverFinder(get_browser_class(browser, 'service')(), options)
+                paths = {
+                    'driver_path': finder.get_driver_path(),
+                    'browser_path': finder.get_browser_path(),
+                }
+                # Without a browser path, a browser upgrade can't be detected
+                if cache is not None and paths['browser_path'] != "":
+                    cache.set(cache_key, {
+                        'key': key,
+                        'paths': paths,
+                        'browser': _get_file_stat(paths['browser_path']),
+                    })
+        _binary_paths[key] = paths
+        return paths
+
+
+def set_binary_paths(browser, options, service, cache=None):
+    """
+    Sets the resolved driver and browser binary paths, if not provided by the user,
+    so that Selenium Manager doesn't run for each new service.
+    With older Selenium versions, the service path is left unset.
+    A shared service keeps the resolved driver path: only the browser path is set in the options.
+
+    Args:
+        browser (str): The browser name.
+
+        options (selenium.webdriver.<browser>.options.Options): The browser options.
+
+        service (selenium.webdriver.<browser>.service.Service): The browser service.
+
+        cache (Cache): The pytest cache, or None.
+    """
+    if service is None or not hasattr(service, "env_path"):
+        return
+    # The driver path of a shared service was resolved when it was built
+    if getattr(service, "resolved_paths", False) is not True:
+        if service.path != "" or service.env_path() is not None:
+            return
+    paths = resolve_binary_paths(browser, options, cache)
+    if paths is None:
+        return
+    if paths['browser_path'] != "" and hasattr(options, "binary_location") and not options.binary_location:
+        options.binary_location = paths['browser_path']
+        options.browser_version = None
+    service.path = paths['driver_path']
+    setattr(service, "resolved_paths", True)
+
+
+def _is_valid_cache_entry(entry, key):
+    """ Whether the cached binary paths still exist and the browser binary hasn't changed since their resolution. """
+    if not isinstance(entry, dict) or entry.get('key') != key:
+        return False
+    paths = entry.get('paths')
+    return (
+        isinstance(paths, dict) and
+        os.path.isfile(paths.get('driver_path', "")) and
+        os.path.isfile(paths.get('browser_path', "")) and
+        entry.get('browser') == _get_file_stat(paths['browser_path'])
+    )
+
+
+def _get_file_stat(filename):
+    """ Returns the modification time and size of a file, or None if it doesn't exist. """
+    try:
+        stat = os.stat(filename)
+    except OSError:
+        return None
+    return [stat.st_mtime_ns, stat.st_size]
@@ -1,51 +1,304 @@
-from selenium.webdriver.common import proxy
-from selenium.webdriver.firefox.firefox_profile import FirefoxProfile
-from selenium.webdriver.firefox.options import Options as Options_Firefox
-from selenium.webdriver.firefox.service import Service as Service_Firefox
-from selenium.webdriver.chrome.options import Options as Options_Chrome
-from selenium.webdriver.chrome.service import Service as Service_Chrome
-from selenium.webdriver.chromium.options import ChromiumOptions as Options_Chromium
-from selenium.webdriver.chromium.service import ChromiumService as Service_Chromium
-from selenium.webdriver.edge.options import Options as Options_Edge
-from selenium.webdriver.edge.service import Service as Service_Edge
-from selenium.webdriver.safari.options import Options as Options_Safari
-from selenium.webdriver.safari.service import Service as Service_Safari
-from . import utils
-
-
-def get_options(browser, config):
-    """ Loads browser options from JSON/YAML webdriver configuration. """
-    options = None
-    try:
-        if browser == "firefox":
-            options = Options_Firefox()
-            if (
-                'browsers' in config and
-                browser in config['browsers'] and
-                'profile' in config['browsers'][browser]
-            ):
-                _set_profile(options, config['browsers'][browser]['profile'])
-        if browser == "chrome":
-            options = Options_Chrome()
-        if browser == "chromium":
-            options = Options_Chromium()
-        if browser == "edge":
-            options = Options_Edge()
-        if browser == "safari":
-            options = Options_Safari()
-    except:
-        raise
+import base64
+import collections
+import functools
+import importlib
+import json
+import os
+import types
+from . import (
+    logger,
+    supported_browsers,
+    utils,
+)
+
+
+# Selenium classes of each browser.
+# The modules are imported when the browser is used.
+browser_classes = {
+    'firefox': {
+        'options':   ("selenium.webdriver.firefox.options", "Options"),
+        'service':   ("selenium.webdriver.firefox.service", "Service"),
+        'webdriver': ("selenium.webdriver.firefox.webdriver", "WebDriver"),
+    },
+    'chrome': {
+        'options':   ("selenium.webdriver.chrome.options", "Options"),
+        'service':   ("selenium.webdriver.chrome.service", "Service"),
+        'webdriver': ("selenium.webdriver.chrome.webdriver", "WebDriver"),
+    },
+    'chromium': {
+        'options':   ("selenium.webdriver.chromium.options", "ChromiumOptions"),
+        'service':   ("selenium.webdriver.chromium.service", "ChromiumService"),
+        'webdriver': ("selenium.webdriver.chromium.webdriver", "ChromiumDriver"),
+    },
+    'edge': {
+        'options':   ("selenium.webdriver.edge.options", "Options"),
+        'service':   ("selenium.webdriver.edge.service", "Service"),
+        'webdriver': ("selenium.webdriver.edge.webdriver", "WebDriver"),
+    },
+    'safari': {
+        'options':   ("selenium.webdriver.safari.options", "Options"),
+        'service':   ("selenium.webdriver.safari.service", "Service"),
+        'webdriver': ("selenium.webdriver.safari.webdriver", "WebDriver"),
+    },
+}
+
+
+# Expected types of the webdriver configuration sections
+config_schema = {
+    'capabilities': {
+        'proxy': dict,
+        'timeouts': {
+            'implicit': (int, float),
+            'script': (int, float),
+            'pageLoad': (int, float),
+        },
+        'acceptInsecureCerts': bool,
+        'pageLoadStrategy': str,
+    },
+    'window': dict,
+    'browsers': dict,
+}
+
+browser_schema = {
+    'profile': {
+        'directory': str,
+        'preferences': dict,
+        'extensions': list,
+    },
+    'options': {
+        'arguments': list,
+        'preferences': dict,
+        'extensions': list,
+    },
+    'service': {
+        'driver_path': str,
+        'port': int,
+        'args': list,
+        'log_output': str,
+    },
+    'addons': list,
+}
+
+# ProxyType attribute of each proxy type.
+# The proxy module is imported when a proxy is configured.
+proxy_types = {
+    'manual':     "MANUAL",
+    'pac':        "PAC",
+    'direct':     "DIRECT",
+    'autodetect': "AUTODETECT",
+    'system':     "SYSTEM",
+}
+
+# Key of the parsed webdriver configuration in the pytest cache
+cache_key = "pytest_selenium_auto/driver_config"
+
+# Parsed webdriver configurations, by file path, modification time and size
+_loaded = {}
+# Validation errors of the parsed webdriver configurations, by file path
+_errors = {}
+
+# Webdriver configuration of a browser
+BrowserPlan = collections.namedtuple(
+    "BrowserPlan",
+    ["browser", "capabilities", "profile", "options", "service", "addons"]
+)
+
+
+@functools.lru_cache(maxsize=None)
+def get_profile_class():
+    """
+    Returns the Firefox profile class, importing its module on first use.
+    """
+    from selenium.webdriver.firefox.firefox_profile import FirefoxProfile
+
+    class EncodedFirefoxProfile(FirefoxProfile):
+        """
+        Firefox profile zipped and encoded only once.
+        The profile must not be modified after its first use.
+        """
+
+        _encoded = None
+
+        def encode(self):
+            """ Zips and encodes the profile directory. """
+            self._encoded = super().encoded
+
+        @property
+        def encoded(self):
+            if self._encoded is None:
+                self.encode()
+            return self._encoded
+
+    return EncodedFirefoxProfile
+
+
+def get_browser_class(browser, kind):
+    """
+    Returns a Selenium class of a browser, importing its module on first use.
+
+    Args:
+        browser (str): The browser name.
+
+        kind (str): The kind of class: 'options', 'service' or 'webdriver'.
+    """
+    module, name = browser_classes[browser][kind]
+    return getattr(importlib.import_module(module), name)
+
+
+def load_config(filename, cache=None):
+    """
+    Loads and validates the JSON/YAML webdriver configuration.
+    The file is parsed once per session and, if a pytest cache is provided, once per modification.
+    The invalid entries of the file are ignored and logged, including when the configuration comes from the cache.
+
+    Args:
+        filename (str): The webdriver configuration filename.
+
+        cache (Cache): The pytest cache, or None.
+
+    Returns:
+        MappingProxyType: The read-only webdriver configuration.
+    """
+    if filename is None or not os.path.isfile(filename):
+        return utils.freeze({})
+    stat = os.stat(filename)
+    key = [os.path.abspath(filename), stat.st_mtime_ns, stat.st_size]
+    if tuple(key) in _loaded:
+        return _loaded[tuple(key)]
+
+    data = None
+    errors = []
+    if cache is not None:
+        entry = cache.get(cache_key, None)
+        if isinstance(entry, dict) and entry.get('key') == key:
+            data = entry.get('data')
+            errors = entry.get('errors', [])
+    if data is None:
+        data = utils.load_json_yaml_file(filename)
+        if data is None:
+            data = {}
+        errors = validate_config(data)
+        if not isinstance(data, dict):
+            data = {}
+        if cache is not None and data != {}:
+            try:
+                # Only cache the configurations surviving a JSON round trip
+                if json.loads(json.dumps(data)) == data:
+                    cache.set(cache_key, {'key': key, 'data': data, 'errors': errors})
+            except Exception:
+                pass
+    # The log folder is recreated at every session
+    if len(errors) > 0:
+        logger.append_driver_error(f"Invalid entries in '{filename}' file. These entries will be ignored",
+                                   "\n".join(errors))
+    _errors[key[0]] = errors
+
+    config = utils.freeze(data)
+    _loaded[tuple(key)] = config
+    return config
+
+
+def get_config_errors(filename):
+    """
+    Returns the validation errors of a loaded webdriver configuration file.
+
+    Returns:
+        list[str]: The validation errors, empty if the file is valid or not loaded.
+    """
+    if filename is None:
+        return []
+    return _errors.get(os.path.abspath(filename), [])
+
+
+def validate_config(config):
+    """
+    Validates the webdriver configuration against the expected types of its sections.
+    The invalid entries are removed from the configuration, the other entries are kept.
+
+    Returns:
+        list[str]: The validation errors.
+    """
+    errors = []
+    if not _validate_section(config, config_schema, "", errors):
+        return errors
+    browsers = config.get('browsers')
+    if isinstance(browsers, dict):
+        for browser in list(browsers):
+            if browser not in supported_browsers:
+                errors.append(f"browsers.{browser}: unsupported browser")
+                del browsers[browser]
+            elif not _validate_section(browsers[browser], browser_schema, f"browsers.{browser}.", errors):
+                del browsers[browser]
+    return errors
+
+
+def _validate_section(section, schema, path, errors):
+    """
+    Validates a section of the webdriver configuration, removing its invalid entries.
+
+    Returns:
+        bool: Whether the section is a mapping. If not, the whole section is invalid.
+    """
+    if not isinstance(section, dict):
+        errors.append(f"{path.rstrip('.') or 'configuration'}: expected a mapping")
+        return False
+    for key, expected in schema.items():
+        if key not in section:
+            continue
+        value = section[key]
+        if isinstance(expected, dict):
+            if not _validate_section(value, expected, f"{path}{key}.", errors):
+                del section[key]
+        elif not isinstance(value, expected) or (expected is int and isinstance(value, bool)):
+            errors.append(f"{path}{key}: unexpected value {value!r}")
+            del section[key]
+    return True
+
+
+def compile_plans(config):
+    """
+    Extracts the sections of the webdriver configuration applying to each browser.
+
+    Args:
+        config (MappingProxyType): The read-only webdriver configuration.
+
+    Returns:
+        MappingProxyType: The BrowserPlan of each supported browser.
+    """
+    plans = {}
+    browsers = config.get('browsers', {})
+    for browser in supported_browsers:
+        section = browsers.get(browser, {})
+        plans[browser] = BrowserPlan(
+            browser=browser,
+            capabilities=config.get('capabilities', {}),
+            profile=section.get('profile'),
+            options=section.get('options'),
+            service=section.get('service', {}),
+            addons=section.get('addons'),
+        )
+    return types.MappingProxyType(plans)
+
+
+def get_options(plan, window):
+    """
+    Loads browser options from JSON/YAML webdriver configuration.
+
+    Args:
+        plan (BrowserPlan): The webdriver configuration of the browser.
 
-    if 'capabilities' in config:
-        _set_general_options(options, config['capabilities'])
-    if 'window' in config and 'headless' in config['window']:
-        _set_headless(options, config['window']['headless'])
-    if (
-        'browsers' in config and
-        browser in config['browsers'] and
-        'options' in config['browsers'][browser]
-    ):
-        _set_specific_options(options, config['browsers'][browser]['options'])
+        window (dict): The window settings.
+    """
+    browser = plan.browser
+    options = get_browser_class(browser, 'options')()
+    if browser == "firefox" and plan.profile is not None:
+        _set_profile(options, plan.profile)
+
+    _set_general_options(options, plan.capabilities)
+    if 'headless' in window:
+        _set_headless(options, window['headless'])
+    if plan.options is not None:
+        _set_specific_options(options, plan.options)
 
     return options
 
@@ -53,68 +306,36 @@ def get_options(browser, config):
 @utils.try_catch_wrap_driver("Error instantiating browser's service.")
 def get_service(browser, config):
     """ Loads browser service from JSON/YAML webdriver configuration. """
-    service = None
-    if browser == "firefox":
-        service = Service_Firefox(
-            executable_path=config.get('driver_path'),
-            port=config.get('port', 0),
-            service_args=config.get('args', None),
-            log_output=config.get('log_output', None),
-        )
-    elif browser == "chrome":
-        service = Service_Chrome(
-            executable_path=config.get('driver_path'),
-            port=config.get('port', 0),
-            service_args=config.get('args', None),
-            log_output=config.get('log_output', None),
-        )
-    elif browser == "chromium":
-        service = Service_Chromium(
-            executable_path=config.get('driver_path'),
-            port=config.get('port', 0),
-            service_args=config.get('args', None),
-            log_output=config.get('log_output', None),
-        )
-    elif browser == "edge":
-        service = Service_Edge(
-            executable_path=config.get('driver_path'),
-            port=config.get('port', 0),
-            service_args=config.get('args', None),
-            log_output=config.get('log_output', None),
-        )
-    elif browser == "safari":
-        service = Service_Safari(
-            executable_path=config.get('driver_path'),
-            port=config.get('port', 0),
-            service_args=config.get('args', None),
-            log_output=config.get('log_output', None),
-        )
-    else:
+    if browser not in browser_classes:
         raise ValueError(f"Invalid browser value: '{browser}'")
-    return service
+    return get_browser_class(browser, 'service')(
+        executable_path=config.get('driver_path'),
+        port=config.get('port', 0),
+        service_args=utils.thaw(config.get('args', None)),
+        log_output=config.get('log_output', None),
+    )
+
+
+def set_driver_capabilities(driver, plan, window):
+    """
+    Loads and sets browser capabilities from JSON/YAML webdriver configuration.
 
+    Args:
+        driver (WebDriver): The webdriver.
 
-def set_driver_capabilities(driver, browser, config):
-    """ Loads and sets browser capabilities from JSON/YAML webdriver configuration. """
+        plan (BrowserPlan): The webdriver configuration of the browser.
+
+        window (dict): The window settings.
+    """
     try:
-        if 'capabilities' in config:
-            if 'timeouts' in config['capabilities']:
-                _set_timeouts(driver, config['capabilities']['timeouts'])
-            if 'window' in config:
-                _set_window(driver, config['window'])
-            if (
-                'window' in config and
-                'maximize' in config['window'] and
-                config['window']['maximize'] is True
-            ):
+        if len(plan.capabilities) > 0:
+            if 'timeouts' in plan.capabilities:
+                _set_timeouts(driver, plan.capabilities['timeouts'])
+            _set_window(driver, window)
+            if 'maximize' in window and window['maximize'] is True:
                 driver.maximize_window()
-            if (
-                browser == 'firefox' and
-                'browsers' in config and
-                'firefox' in config['browsers'] and
-                'addons' in config['browsers']['firefox']
-            ):
-                _install_addons(driver, config['browsers'][browser]['addons'])
+            if plan.browser == 'firefox' and plan.addons is not None:
+                _install_addons(driver, plan.addons)
     except:
         if driver is not None:
             try:
@@ -127,19 +348,11 @@ def set_driver_capabilities(driver, browser, config):
 @utils.try_catch_wrap_driver("Error setting browser's proxy.")
 def _set_proxy(options, config):
     """ Loads browser proxy from JSON/YAML webdriver configuration. """
+    from selenium.webdriver.common import proxy
+    # The webdriver configuration is shared by all the tests
+    config = utils.thaw(config)
     if 'proxyType' in config and isinstance(config['proxyType'], str):
-        if config['proxyType'].lower() == "manual":
-            config['proxyType'] = proxy.ProxyType.MANUAL
-        elif config['proxyType'].lower() == "pac":
-            config['proxyType'] = proxy.ProxyType.PAC
-        elif config['proxyType'].lower() == "direct":
-            config['proxyType'] = proxy.ProxyType.DIRECT
-        elif config['proxyType'].lower() == "autodetect":
-            config['proxyType'] = proxy.ProxyType.AUTODETECT
-        elif config['proxyType'].lower() == "system":
-            config['proxyType'] = proxy.ProxyType.SYSTEM
-        else:
-            config['proxyType'] = proxy.ProxyType.UNSPECIFIED
+        config['proxyType'] = getattr(proxy.ProxyType, proxy_types.get(config['proxyType'].lower(), "UNSPECIFIED"))
     # Remove ftpProxy key
     config.pop('ftpProxy', None)
     options.proxy = proxy.Proxy(config)
@@ -195,13 +408,15 @@ def _set_window(driver, config):
 @utils.try_catch_wrap_driver("Error creating browser's profile.")
 def _set_profile(options, config):
     """ Loads browser profiles (for firefox) from JSON/YAML webdriver configuration. """
-    profile = FirefoxProfile(config.get('directory', None))
+    profile = get_profile_class()(config.get('directory', None))
     if 'preferences' in config:
         for key in config['preferences']:
             profile.set_preference(key, config['preferences'][key])
     if 'extensions' in config:
         for ext in config['extensions']:
             profile.add_extension(ext)
+    # Encoded before the options are copied for each test
+    profile.encode()
     options.profile = profile
 
 
@@ -234,6 +449,18 @@ def _set_specific_options(options, config):
                 options.set_preference(pref, config['preferences'][pref])
         elif opt == "extensions":
             for ext in config['extensions']:
-                options.add_extension(ext)
+                if hasattr(options, "add_encoded_extension"):
+                    # Chromium-based options read and encode the extension files at every use
+                    options.add_encoded_extension(_encode_file(ext))
+                else:
+                    options.add_extension(ext)
         elif hasattr(options, opt):
-            setattr(options, opt, config[opt])
+            setattr(options, opt, utils.thaw(config[opt]))
+
+
+def _encode_file(filename):
+    """ Returns the base64 encoded content of a file. """
+    f = open(os.path.expanduser(filename), 'rb')
+    content = base64.b64encode(f.read()).decode("utf-8")
+    f.close()
+    return content
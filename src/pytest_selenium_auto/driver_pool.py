@@ -0,0 +1,373 @@
+import functools
+import hashlib
+import json
+import threading
+import time
+import traceback
+import urllib.parse
+from concurrent.futures import ThreadPoolExecutor
+from . import logger
+
+try:
+    import psutil
+except ImportError:
+    psutil = None
+
+
+def get_pool_key(browser, options, window):
+    """
+    Returns the key identifying the webdrivers that can be shared between tests.
+
+    Args:
+        browser (str): The browser name.
+
+        options (selenium.webdriver.<browser>.options.Options): The browser options.
+
+        window (dict): The window settings of the test.
+
+    Returns:
+        str: The pool key.
+    """
+    capabilities = options.to_capabilities() if options is not None else {}
+    content = json.dumps([browser, capabilities, window], sort_keys=True, default=str)
+    return hashlib.sha1(content.encode("utf-8")).hexdigest()
+
+
+class DriverPool:
+    """
+    Pool of reusable webdriver sessions.
+
+    Sessions are grouped by pool key (browser + effective options).
+    A released session is reset and kept idle until another test with the same key requests it.
+    """
+
+    def __init__(self, max_uses=0, max_memory=0):
+        """
+        Args:
+            max_uses (int): Number of tests after which a session is recycled. 0 means unlimited.
+
+            max_memory (int): Browser memory (in MB) above which a session is recycled. 0 means unlimited.
+        """
+        self.max_uses = max_uses
+        self.max_memory = max_memory
+        self._idle = {}
+        self._uses = {}
+
+    def acquire(self, key):
+        """
+        Returns an idle session for the given key, or None if there is none.
+
+        Args:
+            key (str): The pool key.
+        """
+        idle = self._idle.get(key, [])
+        if len(idle) > 0:
+            return idle.pop()
+        return None
+
+    def track(self, driver):
+        """ Records the initial state of a new session, restored when the session is released. """
+        if getattr(driver, "pool_origins", None) is not None:
+            return
+        setattr(driver, "pool_origins", set())
+        try:
+            rect = driver.get_window_rect()
+        except Exception:
+            rect = None
+        setattr(driver, "pool_window_rect", rect)
+
+    def has_idle(self, key):
+        """ Whether there is an idle session for the given key. """
+        return len(self._idle.get(key, [])) > 0
+
+    def release(self, key, driver):
+        """ Resets a session and gives it back to the pool, or quits it if it needs to be recycled. """
+        uses = self._uses.get(id(driver), 0) + 1
+        self._uses[id(driver)] = uses
+        if (
+            (self.max_uses > 0 and uses >= self.max_uses)
+            or (self.max_memory > 0 and _get_memory(driver) > self.max_memory)
+            or not _reset(driver)
+        ):
+            self._discard(driver)
+            return
+        self._idle.setdefault(key, []).append(driver)
+
+    def close(self):
+        """ Quits all idle sessions. """
+        for drivers in self._idle.values():
+            for driver in drivers:
+                self._discard(driver)
+        self._idle.clear()
+
+    def _discard(self, driver):
+        self._uses.pop(id(driver), None)
+        _quit(driver)
+
+
+class DriverPrewarmer:
+    """
+    Starts the webdriver session of the next test in a background thread,
+    while the current test is running.
+    """
+
+    def __init__(self):
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="selenium-prewarm")
+        self._pending = None
+        self.stats = {
+            'launched': 0,
+            'used': 0,
+            'launch_time': 0.0,
+            'hidden_time': 0.0,
+        }
+
+    def submit(self, key, factory):
+        """
+        Starts a webdriver session in the background.
+
+        Args:
+            key (str): The pool key of the test expected to use the session.
+
+            factory (callable): Function returning a new webdriver.
+        """
+        if self._pending is not None:
+            return
+        self._pending = (key, self._executor.submit(_launch, factory))
+        self.stats['launched'] += 1
+
+    def take(self, key):
+        """
+        Returns the pre-warmed session if it was started for the given key, otherwise None.
+        Waits for the session start-up to complete, if needed.
+        """
+        if self._pending is None:
+            return None
+        pending_key, future = self._pending
+        self._pending = None
+        if pending_key != key:
+            self._executor.submit(_discard_future, future)
+            return None
+        start = time.perf_counter()
+        try:
+            driver, duration = future.result()
+        except Exception as e:
+            trace = traceback.format_exc()
+            logger.append_driver_error("Error pre-warming webdriver session.", str(e), trace)
+            return None
+        waited = time.perf_counter() - start
+        self.stats['used'] += 1
+        self.stats['launch_time'] += duration
+        self.stats['hidden_time'] += max(duration - waited, 0)
+        return driver
+
+    def close(self):
+        """ Quits the pending session, if any, and stops the background thread. """
+        if self._pending is not None:
+            self._executor.submit(_discard_future, self._pending[1])
+            self._pending = None
+        self._executor.shutdown(wait=True)
+
+
+class ServicePool:
+    """
+    Pool of running webdriver services (chromedriver, geckodriver, etc.) shared by the tests of a session.
+
+    Each service process is started once and runs one webdriver session at a time.
+    The webdrivers neither start nor stop a pooled service: quitting a webdriver gives its service back to the pool.
+    The service processes are stopped when the pool is closed.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._idle = {}
+        self._stops = {}
+        self._closed = False
+        self.stats = {
+            'started': 0,
+            'reused': 0,
+        }
+
+    def acquire(self, key, factory):
+        """
+        Returns an idle running service for the given key, or starts a new service and adds it to the pool.
+
+        Args:
+            key (str): The service key (browser + service settings).
+
+            factory (Callable[[], Service]): The function building the new service, only called if none is idle.
+        """
+        with self._lock:
+            idle = self._idle.get(key, [])
+            while len(idle) > 0:
+                shared = idle.pop()
+                if _is_running(shared):
+                    self.stats['reused'] += 1
+                    return shared
+                # The service process has exited
+                self._stop(shared)
+        service = factory()
+        service.start()
+        stop = service.stop
+        service.start = _no_op
+        service.stop = functools.partial(self._release, key, service)
+        with self._lock:
+            self._stops[id(service)] = stop
+            self.stats['started'] += 1
+            if self._closed:
+                self._stop(service)
+        return service
+
+    def close(self):
+        """ Stops all the service processes. """
+        with self._lock:
+            self._closed = True
+            for stop in self._stops.values():
+                _stop_service(stop)
+            self._stops.clear()
+            self._idle.clear()
+
+    def _release(self, key, service):
+        """ Gives a service back to the pool when its webdriver quits. """
+        with self._lock:
+            if id(service) not in self._stops:
+                return
+            if self._closed:
+                self._stop(service)
+                return
+            idle = self._idle.setdefault(key, [])
+            if service not in idle:
+                idle.append(service)
+
+    def _stop(self, service):
+        stop = self._stops.pop(id(service), None)
+        if stop is not None:
+            _stop_service(stop)
+
+
+def _launch(factory):
+    """ Returns a new webdriver and its start-up duration. """
+    start = time.perf_counter()
+    driver = factory()
+    return driver, time.perf_counter() - start
+
+
+def _discard_future(future):
+    """ Quits the webdriver of an unused pre-warmed session. """
+    try:
+        driver, _ = future.result()
+    except Exception:
+        return
+    _quit(driver)
+
+
+def _quit(driver):
+    try:
+        driver.quit()
+    except Exception:
+        pass
+
+
+def record_origin(driver, url):
+    """ Records an origin visited by a pooled webdriver session. """
+    origins = getattr(driver, "pool_origins", None)
+    if origins is None or url is None:
+        return
+    parts = urllib.parse.urlsplit(url)
+    if parts.scheme in ("http", "https") and parts.netloc != "":
+        origins.add(f"{parts.scheme}://{parts.netloc}")
+
+
+def _reset(driver):
+    """
+    Restores a webdriver session to a blank state:
+    cookies and storage of every visited origin, windows and window size.
+
+    Returns:
+        bool: Whether the session could be reset.
+    """
+    try:
+        try:
+            driver.switch_to.alert.dismiss()
+        except Exception:
+            pass
+        handles = driver.window_handles
+        for handle in handles[1:]:
+            driver.switch_to.window(handle)
+            driver.close()
+        driver.switch_to.window(handles[0])
+        record_origin(driver, driver.current_url)
+        origins = getattr(driver, "pool_origins", None) or set()
+        if not _clear_chromium(driver, origins):
+            # Other browsers only clear the cookies and storage of the current origin
+            for origin in sorted(origins):
+                driver.get(origin)
+                _clear_current_origin(driver)
+            _clear_current_origin(driver)
+        origins.clear()
+        rect = getattr(driver, "pool_window_rect", None)
+        if rect is not None and driver.get_window_rect() != rect:
+            driver.set_window_rect(rect['x'], rect['y'], rect['width'], rect['height'])
+        driver.get("about:blank")
+        return True
+    except Exception as e:
+        trace = traceback.format_exc()
+        logger.append_driver_error("Error resetting pooled webdriver session. The session will be discarded.",
+                                   str(e), trace)
+        return False
+
+
+def _clear_chromium(driver, origins):
+    """
+    Deletes all the cookies, and the storage of the given origins, with Chrome DevTools Protocol commands.
+
+    Returns:
+        bool: Whether the browser supports the commands.
+    """
+    try:
+        for origin in origins:
+            driver.execute_cdp_cmd("Storage.clearDataForOrigin", {'origin': origin, 'storageTypes': "all"})
+        driver.execute_cdp_cmd("Network.clearBrowserCookies", {})
+        return True
+    except Exception:
+        return False
+
+
+def _clear_current_origin(driver):
+    """ Deletes the cookies and the storage of the current page origin. """
+    try:
+        driver.execute_script("window.localStorage.clear(); window.sessionStorage.clear();")
+    except Exception:
+        pass
+    driver.delete_all_cookies()
+
+
+def _get_memory(driver):
+    """ Returns the memory (in MB) used by the driver and browser processes, or 0 if unknown. """
+    if psutil is None:
+        return 0
+    try:
+        pid = driver.capabilities.get("moz:processID")
+        if pid is None:
+            pid = driver.service.process.pid
+        process = psutil.Process(pid)
+        processes = [process] + process.children(recursive=True)
+        return sum(p.memory_info().rss for p in processes) / (1024 * 1024)
+    except Exception:
+        return 0
+
+
+def _is_running(service):
+    """ Whether the process of a service is still running. """
+    process = getattr(service, "process", None)
+    return process is not None and process.poll() is None
+
+
+def _stop_service(stop):
+    try:
+        stop()
+    except Exception:
+        pass
+
+
+def _no_op():
+    pass
@@ -0,0 +1,133 @@
+import functools
+import importlib.util
+import io
+
+
+# File extensions of the supported screenshot formats
+extensions = {
+    'png': "png",
+    'jpeg': "jpg",
+    'webp': "webp",
+}
+
+
+@functools.lru_cache(maxsize=1)
+def has_pillow():
+    """ Whether the Pillow package is installed. Pillow is imported when an image is processed. """
+    return importlib.util.find_spec("PIL") is not None
+
+
+def get_settings(format="png", quality=80, max_width=0, grayscale=False):
+    """
+    Returns the screenshot encoding settings.
+
+    Args:
+        format (str): The image format: png, jpeg or webp.
+
+        quality (int): The compression quality (1-100) of jpeg and webp images.
+
+        max_width (int): The maximum image width in pixels. 0 means no limit.
+
+        grayscale (bool): Whether to convert images to grayscale.
+
+    Returns:
+        dict: The screenshot settings.
+    """
+    if format not in extensions:
+        format = "png"
+    return {
+        'format': format,
+        'quality': min(max(quality, 1), 100),
+        'max_width': max(max_width, 0),
+        'grayscale': grayscale,
+    }
+
+
+def get_extension(settings, data_format):
+    """
+    Returns the file extension of a screenshot.
+
+    Args:
+        settings (dict): The screenshot settings.
+
+        data_format (str): The format of the captured image.
+    """
+    if settings is None:
+        return extensions[data_format]
+    # The image can't be re-encoded without Pillow
+    if settings['format'] != data_format and not has_pillow():
+        return extensions[data_format]
+    return extensions[settings['format']]
+
+
+def needs_conversion(settings, data_format):
+    """ Whether a captured image needs to be re-encoded to apply the screenshot settings. """
+    return (
+        settings is not None
+        and has_pillow()
+        and (
+            settings['format'] != data_format
+            or settings['max_width'] > 0
+            or settings['grayscale']
+        )
+    )
+
+
+def convert(content, settings):
+    """
+    Re-encodes an image according to the screenshot settings.
+
+    Args:
+        content (bytes): The image file content.
+
+        settings (dict): The screenshot settings.
+
+    Returns:
+        bytes: The re-encoded image file content.
+    """
+    from PIL import Image
+    image = Image.open(io.BytesIO(content))
+    max_width = settings['max_width']
+    resize = max_width > 0 and image.width > max_width
+    # The image already complies with the settings (ex: Chromium screenshot)
+    if not resize and not settings['grayscale'] and image.format == settings['format'].upper():
+        return content
+    if resize:
+        height = max(round(image.height * max_width / image.width), 1)
+        image = image.resize((max_width, height), Image.BILINEAR)
+    if settings['grayscale']:
+        image = image.convert("L")
+    elif settings['format'] == "jpeg" and image.mode not in ("RGB", "L"):
+        image = image.convert("RGB")
+    output = io.BytesIO()
+    image.save(output, format=settings['format'].upper(), quality=settings['quality'])
+    return output.getvalue()
+
+
+def thumbnail(content, width, quality=70):
+    """
+    Returns the jpeg thumbnail of an image.
+    The thumbnail shows the top of the image, with a height no greater than its width.
+
+    Args:
+        content (bytes): The image file content.
+
+        width (int): The thumbnail width in pixels.
+
+        quality (int): The jpeg compression quality (1-100).
+
+    Returns:
+        bytes: The thumbnail file content.
+    """
+    from PIL import Image
+    image = Image.open(io.BytesIO(content))
+    if image.width > width:
+        height = max(round(image.height * width / image.width), 1)
+        image = image.resize((width, height), Image.BILINEAR)
+    if image.height > image.width:
+        image = image.crop((0, 0, image.width, image.width))
+    if image.mode not in ("RGB", "L"):
+        image = image.convert("RGB")
+    output = io.BytesIO()
+    image.save(output, format="JPEG", quality=quality)
+    return output.getvalue()
@@ -0,0 +1,135 @@
+import contextlib
+import json
+import time
+
+
+# Overhead records of the tests of the session
+records = []
+
+
+def init_timings(driver, enabled):
+    """
+    Adds the overhead timing metadata to a webdriver.
+
+    Args:
+        driver (WebDriver): The webdriver.
+
+        enabled (bool): Whether to measure the plugin overhead.
+    """
+    setattr(driver, "timings", {} if enabled else None)
+    setattr(driver, "step_timing", {})
+    setattr(driver, "step_timings", [])
+    setattr(driver, "timer_stack", [])
+
+
+@contextlib.contextmanager
+def timer(driver, category):
+    """
+    Context measuring the time spent by the plugin in an overhead category.
+    The time spent in nested timers is only counted in their own category.
+
+    Args:
+        driver (WebDriver): The webdriver.
+
+        category (str): The overhead category: screenshot, page_source, attributes, pause or report.
+    """
+    timings = getattr(driver, "timings", None)
+    if timings is None:
+        yield
+        return
+    # Time spent in the nested timers of each active timer
+    nested = driver.timer_stack
+    nested.append(0.0)
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        total = time.perf_counter() - start
+        elapsed = total - nested.pop()
+        if len(nested) > 0:
+            nested[-1] += total
+        timings[category] = timings.get(category, 0.0) + elapsed
+        step = driver.step_timing
+        step[category] = step.get(category, 0.0) + elapsed
+
+
+def timed(category, driver_index=-1):
+    """
+    Decorator measuring the time spent by a function in an overhead category.
+
+    Args:
+        category (str): The overhead category.
+
+        driver_index (int): The position of the webdriver in the function arguments.
+    """
+    def decorator(func):
+        def wrapped(*args, **kwargs):
+            with timer(args[driver_index], category):
+                return func(*args, **kwargs)
+        return wrapped
+    return decorator
+
+
+def end_step(driver):
+    """ Closes the timing record of the current test step. """
+    if getattr(driver, "timings", None) is None:
+        return
+    driver.step_timings.append(driver.step_timing)
+    driver.step_timing = {}
+
+
+def step(func):
+    """ Decorator closing the timing record of a test step after an event listener method. """
+    def wrapped(*args, **kwargs):
+        try:
+            return func(*args, **kwargs)
+        finally:
+            # The webdriver is the last argument of the event listener methods
+            end_step(args[-1])
+    return wrapped
+
+
+def record_test(nodeid, driver):
+    """ Stores the overhead record of a test. """
+    timings = getattr(driver, "timings", None)
+    if timings is None:
+        return None
+    record = {
+        'nodeid': nodeid,
+        'total': sum(timings.values()),
+        'timings': dict(timings),
+        'steps': driver.step_timings,
+    }
+    records.append(record)
+    return record
+
+
+def get_summary(records):
+    """
+    Returns the overhead summary of a list of test records.
+
+    Returns:
+        dict: The number of tests, the total overhead and the overhead per category.
+    """
+    categories = {}
+    for record in records:
+        for category, value in record['timings'].items():
+            categories[category] = categories.get(category, 0.0) + value
+    return {
+        'tests': len(records),
+        'total': sum(record['total'] for record in records),
+        'categories': categories,
+    }
+
+
+def write_summary(filename, records):
+    """ Writes the overhead summary and the test records in JSON format. """
+    f = open(filename, 'w', encoding="utf-8")
+    json.dump({'summary': get_summary(records), 'tests': records}, f, indent=2)
+    f.close()
+
+
+def format_timings(timings):
+    """ Returns a string representation of the overhead per category. """
+    items = sorted(timings.items(), key=lambda item: item[1], reverse=True)
+    return ", ".join(f"{category}: {value:.3f}s" for category, value in items)
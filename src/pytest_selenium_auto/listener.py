@@ -1,9 +1,16 @@
 from selenium.webdriver.support.events import AbstractEventListener
 from selenium.webdriver.remote.webelement import By
+import collections
+import functools
 import re
+import sys
 import time
+import traceback
 from . import (
     action_keywords,
+    driver_pool,
+    instrumentation,
+    step_log,
     utils,
     value_keywords,
 )
@@ -12,65 +19,88 @@ from . import (
 class CustomEventListener(AbstractEventListener):
     """ The WebDriver event listener. """
 
-    def __init__(self, pause=0):
+    def __init__(self, pause=0, pause_mode="fixed", settle_time=0.1):
+        """
+        Args:
+            pause (float): The pause in seconds after webdriver events.
+                With the 'adaptive' pause mode, the maximum wait.
+
+            pause_mode (str): 'fixed' to sleep for the pause duration,
+                'adaptive' to wait until the web page is settled.
+
+            settle_time (float): The time in seconds without DOM mutations
+                after which the web page is considered settled.
+        """
         self._attributes = None
         self._locator = None
         self._value = None
         self._url = None
         self.pause = pause
+        self.pause_mode = pause_mode
+        self.settle_time = settle_time
 
     def before_navigate_to(self, url: str, driver) -> None:
-        pass
+        step_log.start_step(driver)
 
+    @instrumentation.step
+    @utils.plugin_commands_counter
     def after_navigate_to(self, url: str, driver) -> None:
-        _append_extras(
+        comment = _append_extras(
             driver,
             {
                 'action': "Navigate to",
                 'url': url,
             }
         )
-        self._url = driver.current_url
-        time.sleep(self.pause)
+        self._set_url(driver, driver.current_url)
+        self._end_step(driver, comment)
 
     def before_navigate_back(self, driver) -> None:
-        pass
+        step_log.start_step(driver)
 
+    @instrumentation.step
+    @utils.plugin_commands_counter
     def after_navigate_back(self, driver) -> None:
-        _append_extras(
+        comment = _append_extras(
             driver,
             {
                 'action': "Navigate back",
             }
         )
-        self._url = driver.current_url
-        time.sleep(self.pause)
+        self._set_url(driver, driver.current_url)
+        self._end_step(driver, comment)
 
     def before_navigate_forward(self, driver) -> None:
-        pass
+        step_log.start_step(driver)
 
+    @instrumentation.step
+    @utils.plugin_commands_counter
     def after_navigate_forward(self, driver) -> None:
-        _append_extras(
+        comment = _append_extras(
             driver,
             {
                 'action': "Navigate forward",
             }
         )
-        self._url = driver.current_url
-        time.sleep(self.pause)
+        self._set_url(driver, driver.current_url)
+        self._end_step(driver, comment)
 
+    @utils.plugin_commands_counter
     def before_click(self, element, driver) -> None:
+        step_log.start_step(driver)
         self._attributes = _get_web_element_attributes(element, driver)
         self._locator = _get_web_element_locator(element, driver)
 
     @utils.try_catch_wrap_event("Undetermined event")
+    @instrumentation.step
+    @utils.plugin_commands_counter
     def after_click(self, element, driver) -> None:
         if driver.current_url != self._url:
-            self._url = driver.current_url
+            self._set_url(driver, driver.current_url)
         else:
             self._attributes = _get_web_element_attributes(element, driver)
         action, value = _build_comment(driver, element, "Click", self._locator)
-        _append_extras(
+        comment = _append_extras(
             driver,
             {
                 'action': action,
@@ -81,12 +111,16 @@ class CustomEventListener(AbstractEventListener):
         )
         self._attributes = None
         self._locator = None
-        time.sleep(self.pause)
+        self._end_step(driver, comment)
 
+    @utils.plugin_commands_counter
     def before_change_value_of(self, element, driver) -> None:
+        step_log.start_step(driver)
         self._value = element.get_attribute("value")
 
     @utils.try_catch_wrap_event("Undetermined event")
+    @instrumentation.step
+    @utils.plugin_commands_counter
     def after_change_value_of(self, element, driver) -> None:
         self._attributes = _get_web_element_attributes(element, driver)
         self._locator = _get_web_element_locator(element, driver)
@@ -94,7 +128,7 @@ class CustomEventListener(AbstractEventListener):
             self._value = element.get_attribute("value")
             if len(self._value) > 0:
                 action, value = _build_comment(driver, element, "Send keys", self._locator)
-                _append_extras(
+                comment = _append_extras(
                     driver,
                     {
                         'action': action,
@@ -105,7 +139,7 @@ class CustomEventListener(AbstractEventListener):
                 )
             else:
                 action, value = _build_comment(driver, element, "Clear", self._locator)
-                _append_extras(
+                comment = _append_extras(
                     driver,
                     {
                         'action': action,
@@ -116,7 +150,7 @@ class CustomEventListener(AbstractEventListener):
                 )
         else:
             action, value = _build_comment(driver, element, "Click", self._locator)
-            _append_extras(
+            comment = _append_extras(
                 driver,
                 {
                     'action': action,
@@ -127,7 +161,7 @@ class CustomEventListener(AbstractEventListener):
         self._attributes = None
         self._locator = None
         self._value = None
-        time.sleep(self.pause)
+        self._end_step(driver, comment)
 
     def before_quit(self, driver) -> None:
         self._attributes = None
@@ -138,6 +172,42 @@ class CustomEventListener(AbstractEventListener):
     def on_exception(self, exception, driver) -> None:
         pass
 
+    def _set_url(self, driver, url):
+        """ Records the current URL, and its origin for the reset of pooled sessions. """
+        self._url = url
+        driver_pool.record_origin(driver, url)
+
+    def _end_step(self, driver, comment):
+        """
+        Ends a test step: pauses, then logs the test step.
+        The step is logged after the pause so that its end time and duration include the wait.
+        """
+        self._pause(driver, comment)
+        if driver.screenshots == 'all':
+            step_log.log_step(driver, comment, driver.images[-1], driver.sources[-1])
+        else:
+            step_log.log_step(driver, comment)
+
+    def _pause(self, driver, comment=None):
+        """
+        Pauses after a webdriver event.
+        With the 'adaptive' pause mode, the duration of the wait is logged in the test step comment,
+        and recorded by screenshot position for the screenshot links of the report.
+        """
+        if self.pause <= 0:
+            return
+        with instrumentation.timer(driver, "pause"):
+            if self.pause_mode == "adaptive":
+                wait = _wait_until_settled(driver, self.settle_time, self.pause)
+                if comment is not None:
+                    comment['wait'] = wait
+                if driver.screenshots == 'all':
+                    driver.waits[len(driver.images) - 1] = wait
+                elif driver.screenshots == 'buffer' and len(driver.buffer) > 0:
+                    driver.buffer[-1]['wait'] = wait
+            else:
+                time.sleep(self.pause)
+
 
 def _append_extras(driver, comment):
     """
@@ -157,6 +227,9 @@ def _append_extras(driver, comment):
                 }
                 or
                 {"comment": str}
+
+    Returns:
+        dict: The comment.
     """
     if driver.screenshots == 'all' and driver.log_attributes:
         _append_comment(driver, comment)
@@ -164,6 +237,9 @@ def _append_extras(driver, comment):
         index = utils.counter()
         _append_screenshot(driver, index)
         _append_page_source(driver, index)
+    if driver.screenshots == 'buffer':
+        _append_buffer(driver, comment)
+    return comment
 
 
 def _append_comment(driver, comment):
@@ -192,21 +268,142 @@ def _append_page_source(driver, index):
         driver.sources.append(None)
 
 
+def _append_buffer(driver, comment):
+    """
+    Appends a test step to the webdriver ring buffer.
+    The screenshot and page source are kept in memory until the end of the test.
+    """
+    screenshot = None
+    source = None
+    try:
+        with instrumentation.timer(driver, "screenshot"):
+            screenshot = utils.get_screenshot_data(driver, driver.screenshot_settings)
+        if driver.log_page_source:
+            with instrumentation.timer(driver, "page_source"):
+                source = driver.page_source
+    except Exception as e:
+        trace = traceback.format_exc()
+        print(f"{str(e)}\n\n{trace}", file=sys.stderr)
+    driver.buffer.append({
+        'comment': comment if driver.log_attributes else None,
+        'screenshot': screenshot,
+        'source': source,
+        'wait': None,
+    })
+
+
+# Asynchronous script waiting until the web page is settled:
+# the document is loaded, there are no pending fetch or XMLHttpRequest requests
+# and there have been no DOM mutations for the settle time.
+# Resolves with true if the web page is settled, or false when the timeout expires.
+settle_script = """
+var settle = arguments[0], timeout = arguments[1], done = arguments[arguments.length - 1];
+var w = window;
+if (w.__seleniumAutoPending === undefined) {
+    w.__seleniumAutoPending = 0;
+    if (w.fetch) {
+        var fetch = w.fetch;
+        w.fetch = function() {
+            w.__seleniumAutoPending++;
+            return fetch.apply(this, arguments).finally(function() { w.__seleniumAutoPending--; });
+        };
+    }
+    if (w.XMLHttpRequest) {
+        var send = w.XMLHttpRequest.prototype.send;
+        w.XMLHttpRequest.prototype.send = function() {
+            w.__seleniumAutoPending++;
+            this.addEventListener("loadend", function() { w.__seleniumAutoPending--; });
+            return send.apply(this, arguments);
+        };
+    }
+}
+var start = Date.now(), last = start;
+var observer = new MutationObserver(function() { last = Date.now(); });
+observer.observe(document, {childList: true, subtree: true, attributes: true, characterData: true});
+function check() {
+    var now = Date.now();
+    if (document.readyState === "complete" && w.__seleniumAutoPending <= 0 && now - last >= settle) {
+        observer.disconnect();
+        done(true);
+    } else if (now - start >= timeout) {
+        observer.disconnect();
+        done(false);
+    } else {
+        setTimeout(check, 25);
+    }
+}
+check();
+"""
+
+
+def _wait_until_settled(driver, settle_time, timeout):
+    """
+    Waits until the web page is settled.
+
+    Args:
+        driver (WebDriver): The webdriver.
+
+        settle_time (float): The time in seconds without DOM mutations.
+
+        timeout (float): The maximum wait in seconds.
+
+    Returns:
+        float: The duration of the wait in seconds.
+    """
+    start = time.perf_counter()
+    remaining = timeout
+    while remaining > 0:
+        try:
+            driver.execute_async_script(settle_script, int(settle_time * 1000), int(remaining * 1000))
+            break
+        except Exception:
+            # The script is interrupted when the event triggers a page load: wait for the new page
+            time.sleep(min(settle_time, remaining))
+        remaining = timeout - (time.perf_counter() - start)
+    return time.perf_counter() - start
+
+
+# Script collecting the webelement attributes in a single WebDriver command
+attributes_script = """
+var e = arguments[0];
+var value = e.value !== undefined ? e.value : e.getAttribute("value");
+return {
+    "tag": e.tagName.toLowerCase(),
+    "id": e.getAttribute("id"),
+    "name": e.getAttribute("name"),
+    "type": e.getAttribute("type"),
+    "value": value === null || value === undefined ? null : String(value),
+    "checked": !!(e.selected || e.checked),
+    "class": e.getAttribute("class"),
+    "href": e.getAttribute("href"),
+    "text": e.innerText === undefined ? e.textContent : e.innerText
+};
+"""
+
+
+@instrumentation.timed("attributes")
 @utils.try_catch_wrap_event("Undetermined WebElement")
 def _get_web_element_attributes(element, driver):
     """ Returns a string representation of the webelement attributes. """
-    if not (driver.screenshots == 'all' and driver.log_attributes):
+    if not (driver.screenshots in ('all', 'buffer') and driver.log_attributes):
         return None
 
-    elem_tag = element.tag_name
-    elem_id = element.get_dom_attribute("id")
-    elem_name = element.get_dom_attribute("name")
-    elem_type = element.get_dom_attribute("type")
-    elem_value = element.get_attribute("value")
-    elem_checked = element.is_selected()
-    elem_classes = element.get_dom_attribute("class")
-    elem_href = element.get_dom_attribute("href")
-    elem_text = element.text
+    try:
+        attributes = driver.execute_script(attributes_script, element)
+    except Exception:
+        attributes = None
+    if not isinstance(attributes, dict):
+        attributes = _get_web_element_attributes_fallback(element)
+
+    elem_tag = attributes.get('tag')
+    elem_id = attributes.get('id')
+    elem_name = attributes.get('name')
+    elem_type = attributes.get('type')
+    elem_value = attributes.get('value')
+    elem_checked = attributes.get('checked')
+    elem_classes = attributes.get('class')
+    elem_href = attributes.get('href')
+    elem_text = attributes.get('text')
 
     label = "&lt;"
     if elem_tag is not None:
@@ -231,6 +428,22 @@ def _get_web_element_attributes(element, driver):
     return label
 
 
+def _get_web_element_attributes_fallback(element):
+    """ Returns the webelement attributes with one WebDriver command per attribute. """
+    return {
+        'tag': element.tag_name,
+        'id': element.get_dom_attribute("id"),
+        'name': element.get_dom_attribute("name"),
+        'type': element.get_dom_attribute("type"),
+        'value': element.get_attribute("value"),
+        'checked': element.is_selected(),
+        'class': element.get_dom_attribute("class"),
+        'href': element.get_dom_attribute("href"),
+        'text': element.text,
+    }
+
+
+@instrumentation.timed("attributes")
 def _get_web_element_locator(element, driver):
     """
     Returns a string representation of the locator from the
@@ -239,7 +452,7 @@ def _get_web_element_locator(element, driver):
     Returns:
         str: String representation of the webelement locator.
     """
-    if not (driver.screenshots == 'all' and driver.log_attributes):
+    if not (driver.screenshots in ('all', 'buffer') and driver.log_attributes):
         return None
 
     if not hasattr(element, "locator_by") and not hasattr(element, "locator_value"):
@@ -289,6 +502,7 @@ def _get_web_element_locator(element, driver):
     return f"{by} = {element.locator_value}"
 
 
+@instrumentation.timed("attributes", driver_index=0)
 def _build_comment(driver, element, action, locator):
     """
     Builds the comment of a test step based on the
@@ -312,92 +526,138 @@ def _build_comment(driver, element, action, locator):
     Returns:
         (str, str): The action and the value to build the comment of a test step.
     """
-    if not (driver.screenshots == 'all' and driver.log_attributes):
+    if not (driver.screenshots in ('all', 'buffer') and driver.log_attributes):
         return None, None
 
     description = getattr(element, "description", None)
 
-    value, description = _get_comment_value(element, description, locator)
-
     # Is this an input text without description ?
     if description is None:
         if action == "Clear":
             return action, None
         else:
-            return action, value
+            return action, _get_value_attribute(element)
+
+    template = _compile_description(description)
+    value = _get_comment_value(element, template, locator)
+    action = _get_comment_action(element, template)
+
+    return action, value
+
+
+# Description template of a test step comment.
+#   description: The description without the value keywords and quoted literals.
+#   value_source: Where the value of the comment comes from: 'value', 'attribute', 'locator' or 'literal'.
+#   value: The attribute name for the 'attribute' source, or the text for the 'literal' source.
+#   uses_locator: Whether the description contains the $by keyword.
+#   action_keyword: The action keyword the description starts with, if any.
+#   actions: The description for a selected and an unselected webelement, if there is an action keyword.
+DescriptionTemplate = collections.namedtuple(
+    "DescriptionTemplate",
+    ["description", "value_source", "value", "uses_locator", "action_keyword", "actions"]
+)
+
+# Regular expressions of the description keywords
+_by_regex = re.compile(r"(\"\$by\"|'\$by'|\$by)")
+_select_regex = re.compile(r"(\$by|\"\$by\"|'\$by')")
+_literal_regex = re.compile(r"(\".*\"|'.*')")
+_value_keyword_regexes = {word: re.compile(f"(\"{re.escape(word)}\"|'{re.escape(word)}'|{re.escape(word)})")
+                          for word in value_keywords}
+
+
+@functools.lru_cache(maxsize=256)
+def _compile_description(description):
+    """
+    Parses the description pattern of a webelement interaction.
+
+    Returns:
+        DescriptionTemplate: The compiled description.
+    """
+    value_source = "value"
+    value = None
+    uses_locator = False
+
+    # Is '$by' being used as value keyword ?
+    # Then, extract the value from webelement metadata.
+    expr = _by_regex.search(description)
+    if expr is not None:
+        description = description.replace(expr.group(0), '').strip()
+        value_source = "locator"
+        uses_locator = True
+
+    # Is a value keyword present in description ?
+    # Then, extract the value from webelement attributes.
+    description = description.replace("$visible_text", "$text")
+    for word in value_keywords:
+        if word in description:
+            expr = _value_keyword_regexes[word].search(description)
+            if expr is not None:
+                value_source = "attribute"
+                value = word[1:]
+                description = description.replace(expr.group(0), '').strip()
+                break
+
+    # Is there any other string surrounded by quotation?
+    # Then, use it as value for the comment.
+    expr = _literal_regex.search(description)
+    if expr is not None:
+        value_source = "literal"
+        value = expr.group(0).replace('"', '').replace("'", '')
+        description = description.replace(expr.group(0), '').strip()
 
     # Is this a select ?
     # Replace $by by the locator and use it as value for the comment.
-    expr = re.search(r"(\$by|\"\$by\"|'\$by')", description)
+    expr = _select_regex.search(description)
     if expr is not None:
         description = description.replace(expr.group(0), '').strip()
-        value = locator[locator.index('=') + 2:]
+        value_source = "locator"
+        value = None
+        uses_locator = True
 
-    action = _get_comment_action(element, description)
+    action_keyword = None
+    actions = None
+    for word in action_keywords.keys():
+        if description.startswith(word):
+            action_keyword = word
+            actions = (
+                description.replace(word, action_keywords[word][0]),
+                description.replace(word, action_keywords[word][1]),
+            )
+            break
 
-    return action, value
+    return DescriptionTemplate(description, value_source, value, uses_locator, action_keyword, actions)
 
 
-def _get_comment_action(element, description):
+def _get_comment_action(element, template):
     """ Returns the action for the comment of a test step. """
+    if template.action_keyword is None:
+        return template.description
     try:
         is_selected = element.is_selected()
     except:
         is_selected = None
-    if description is None or is_selected is None:
-        return description
-
-    for word in action_keywords.keys():
-        if description.startswith(word):
-            action = action_keywords[word][0] if is_selected else action_keywords[word][1]
-            description = description.replace(word, action)
-            break
-
-    return description
-
+    if is_selected is None:
+        return template.description
+    return template.actions[0] if is_selected else template.actions[1]
 
-def _get_comment_value(element, description, locator):
-    """
-    Returns the value for the comment of a test step.
-    Removes the value from the description.
 
-    Returns:
-        (str, str): The value and the remaining of the description.
-    """
+def _get_comment_value(element, template, locator):
+    """ Returns the value for the comment of a test step. """
     value = None
+    if template.uses_locator:
+        value = locator[locator.index('=') + 2:]
+    if template.value_source == "value":
+        value = _get_value_attribute(element)
+    elif template.value_source == "attribute":
+        value = element.get_attribute(template.value)
+    elif template.value_source == "literal":
+        value = template.value
+    return value
 
-    # Is this an input text ?
+
+def _get_value_attribute(element):
+    """ Returns the value attribute of a webelement, or None if it cannot be retrieved. """
     try:
-        value = element.get_attribute("value")
+        return element.get_attribute("value")
     except:
-        pass
-
-    if description is not None:
-        # Is '$by' being used as value keyword ?
-        # Then, extract the value from webelement metadata.
-        expr = re.search(r"(\"\$by\"|'\$by'|\$by)", description)
-        if expr is not None:
-            description = description.replace(expr.group(0), '').strip()
-            value = locator[locator.index('=') + 2:]
-
-        # Is a value keyword present in description ?
-        # Then, extract the value from webelement attributes.
-        description = description.replace("$visible_text", "$text")
-        for word in value_keywords:
-            if word in description:
-                regex = f"(\"{word}\"|'{word}'|{word})"
-                regex = regex.replace("$", "\\$")
-                expr = re.search(regex, description)
-                if expr is not None:
-                    value = element.get_attribute(word[1:])
-                    description = description.replace(expr.group(0), '').strip()
-                    break
-
-        # Is there any other string surrounded by quotation?
-        # Then, use it as value for the comment.
-        expr = re.search(r"(\".*\"|'.*')", description)
-        if expr is not None:
-            value = expr.group(0).replace('"', '').replace("'", '')
-            description = description.replace(expr.group(0), '').strip()
-
-    return value, description
+        return None
@@ -1,13 +1,55 @@
+import atexit
+import datetime
+import json
 import os
 import pathlib
 import shutil
 import sys
+import threading
 import traceback
 
 
 logfile = f"logs{os.sep}webdriver.log"
 separator = 64 * '='
 
+# Logger settings
+settings = {
+    'format': "text",   # text or json
+    'max_size': 0,      # Size in bytes above which the log file is rotated. 0 means no rotation.
+    'backups': 5,       # Number of rotated log files kept
+    'buffer_size': 32,  # Number of records kept in memory before being written
+}
+
+# Records not yet written to the log file
+_buffer = []
+_lock = threading.RLock()
+# Number of driver errors logged, reported at the end of the session
+error_count = 0
+
+
+def configure(format="text", max_size=0, buffer_size=32):
+    """
+    Sets the logger settings.
+
+    Args:
+        format (str): The log record format: 'text' or 'json' (JSON lines).
+
+        max_size (int): The size in bytes above which the log file is rotated. 0 means no rotation.
+
+        buffer_size (int): The number of records kept in memory before being written. 0 means no buffering.
+    """
+    settings['format'] = "json" if format == "json" else "text"
+    settings['max_size'] = max(max_size, 0)
+    settings['buffer_size'] = max(buffer_size, 0)
+
+
+def get_logfile():
+    """ Returns the log file path. Each pytest-xdist worker has its own log file. """
+    worker = os.environ.get("PYTEST_XDIST_WORKER")
+    if worker is not None:
+        return f"logs{os.sep}webdriver-{worker}.log"
+    return logfile
+
 
 def init():
     """ Recreates logs folder. """
@@ -27,29 +69,88 @@ def init():
 
 
 def append_driver_error(description, error=None, trace=None):
-    """ Appends a Driver related error message to the log file. """
+    """
+    Appends a Driver related error message to the log file.
+    The errors are not printed: their number is reported at the end of the session.
+    """
+    global error_count
     content = description
     if error is not None:
         content = content + "\n\n" + str(error)
     if trace is not None:
         content = content + "\n\n" + trace
-    print(content, file=sys.stderr)
-    content += f"\n{separator}\n\n"
-    _write(content)
+    with _lock:
+        error_count += 1
+    if settings['format'] == "json":
+        _write(_get_record("driver", description, error=error, trace=trace))
+    else:
+        content += f"\n{separator}\n\n"
+        _write(content)
 
 
 def append_report_error(module, function, message):
     """ Appends a general error message to the log file. """
-    _write(f"{module} :: {function}  -  {message}\n")
+    if settings['format'] == "json":
+        _write(_get_record("report", message, module=module, function=function))
+    else:
+        _write(f"{module} :: {function}  -  {message}\n")
+
+
+def flush():
+    """ Writes the buffered records to the log file. """
+    with _lock:
+        if len(_buffer) == 0:
+            return
+        content = "".join(_buffer)
+        _buffer.clear()
+        logfile = get_logfile()
+        try:
+            pathlib.Path(logfile).parent.mkdir(exist_ok=True)
+            _rotate(logfile, len(content.encode("utf-8")))
+            f = open(logfile, 'a', encoding="utf-8")
+            f.write(content)
+            f.close()
+        except Exception as e:
+            trace = traceback.format_exc()
+            print(f"Error writing to '{logfile}' file\n", file=sys.stderr)
+            print(f"{str(e)}\n\n{trace}\n", file=sys.stderr)
 
 
 def _write(content):
-    """ Writes a line in the log file. """
-    try:
-        f = open(logfile, 'a')
-        f.write(content)
-        f.close()
-    except Exception as e:
-        trace = traceback.format_exc()
-        print(f"Error writing to '{logfile}' file\n", file=sys.stderr)
-        print(f"{str(e)}\n\n{trace}\n", file=sys.stderr)
+    """ Appends a record to the buffer, and writes the buffer to the log file when full. """
+    with _lock:
+        _buffer.append(content)
+        if len(_buffer) > settings['buffer_size']:
+            flush()
+
+
+def _get_record(kind, message, **fields):
+    """ Returns a log record in JSON lines format. """
+    record = {
+        'time': datetime.datetime.now().isoformat(),
+        'worker': os.environ.get("PYTEST_XDIST_WORKER"),
+        'pid': os.getpid(),
+        'kind': kind,
+        'message': message,
+    }
+    for key, value in fields.items():
+        if value is not None:
+            record[key] = str(value)
+    return json.dumps(record, ensure_ascii=False) + "\n"
+
+
+def _rotate(logfile, size):
+    """ Rotates the log file if writing the given number of bytes would exceed the maximum size. """
+    max_size = settings['max_size']
+    if max_size <= 0 or not os.path.isfile(logfile):
+        return
+    if os.path.getsize(logfile) + size <= max_size:
+        return
+    for i in range(settings['backups'] - 1, 0, -1):
+        if os.path.isfile(f"{logfile}.{i}"):
+            os.replace(f"{logfile}.{i}", f"{logfile}.{i + 1}")
+    os.replace(logfile, f"{logfile}.1")
+
+
+# Write the pending records if the session is interrupted
+atexit.register(flush)
@@ -1,17 +1,16 @@
 import importlib
+import json
 import os
 import pathlib
 import pytest
 import re
 from importlib.metadata import version
 from pytest_metadata.plugin import metadata_key
-from selenium.webdriver.firefox.webdriver import WebDriver as WebDriver_Firefox
-from selenium.webdriver.chrome.webdriver import WebDriver as WebDriver_Chrome
-from selenium.webdriver.chromium.webdriver import ChromiumDriver as WebDriver_Chromium
-from selenium.webdriver.edge.webdriver import WebDriver as WebDriver_Edge
-from selenium.webdriver.safari.webdriver import WebDriver as WebDriver_Safari
 
 from . import (
+    imaging,
+    instrumentation,
+    logger,
     markers,
     supported_browsers,
     utils
@@ -19,12 +18,27 @@ from . import (
 from .browser_settings import (
     browser_options,
     browser_service,
+    get_service_key,
+    set_binary_paths,
 )
-from .configuration_loader import set_driver_capabilities
-from .listener import CustomEventListener
-from .wrappers import (
-    CustomEventFiringWebDriver,
-    wrap_driver,
+from .artifact_writer import ArtifactWriter
+from .configuration_loader import (
+    compile_plans,
+    get_browser_class,
+    get_config_errors,
+    load_config,
+    set_driver_capabilities,
+)
+from .driver_pool import (
+    DriverPool,
+    DriverPrewarmer,
+    ServicePool,
+    get_pool_key,
+)
+from .step_log import (
+    StepLog,
+    get_step_log_filename,
+    init_step_log,
 )
 
 
@@ -51,13 +65,13 @@ def pytest_addoption(parser):
         action="store",
         default="all",
         help="The screenshot gathering strategy.",
-        choices=("all", "last", "failed", "manual", "none"),
+        choices=("all", "buffer", "last", "failed", "manual", "none"),
     )
     group.addoption(
         "--log-attributes",
         action="store_true",
         default=False,
-        help="Whether to log WebElement attributes. Only applicable when --screenshots=all",
+        help="Whether to log WebElement attributes. Only applicable when --screenshots=all or buffer",
     )
     group.addoption(
         "--log-page-source",
@@ -125,6 +139,180 @@ def pytest_addoption(parser):
         default="0",
         help="Number of seconds to pause after webdriver events."
     )
+    parser.addini(
+        "pause_mode",
+        type="string",
+        default="fixed",
+        help="How to pause after webdriver events. Accepted values: fixed or adaptive.",
+    )
+    parser.addini(
+        "pause_settle_time",
+        type="string",
+        default="100",
+        help="Time in milliseconds without DOM mutations after which a web page is settled, "
+             "with the adaptive pause mode.",
+    )
+    parser.addini(
+        "driver_pool",
+        type="bool",
+        default=False,
+        help="Whether to reuse webdriver sessions between tests.",
+    )
+    parser.addini(
+        "driver_pool_max_uses",
+        type="string",
+        default="0",
+        help="Number of tests after which a pooled webdriver session is recycled. 0 means unlimited.",
+    )
+    parser.addini(
+        "driver_pool_max_memory",
+        type="string",
+        default="0",
+        help="Browser memory (in MB) above which a pooled webdriver session is recycled. 0 means unlimited.",
+    )
+
+    parser.addini(
+        "driver_prewarm",
+        type="bool",
+        default=False,
+        help="Whether to start the webdriver session of the next test in the background.",
+    )
+    parser.addini(
+        "driver_paths_cache",
+        type="bool",
+        default=False,
+        help="Whether to keep the driver and browser paths resolved by Selenium Manager in the pytest cache.",
+    )
+    parser.addini(
+        "shared_driver_service",
+        type="bool",
+        default=False,
+        help="Whether to start the driver service (chromedriver, geckodriver, etc.) once per session.",
+    )
+
+    parser.addini(
+        "writer_threads",
+        type="string",
+        default="2",
+        help="Number of background threads writing screenshots and page sources. 0 means synchronous writes.",
+    )
+    parser.addini(
+        "writer_queue_size",
+        type="string",
+        default="32",
+        help="Maximum number of pending screenshot and page source writes.",
+    )
+
+    parser.addini(
+        "webdriver_log_format",
+        type="string",
+        default="text",
+        help="Format of the webdriver log file records. Accepted values: text or json.",
+    )
+    parser.addini(
+        "webdriver_log_max_size",
+        type="string",
+        default="0",
+        help="Size in MB above which the webdriver log file is rotated. 0 means no rotation.",
+    )
+    parser.addini(
+        "webdriver_log_buffer_size",
+        type="string",
+        default="32",
+        help="Number of webdriver log records kept in memory before being written.",
+    )
+    parser.addini(
+        "log_steps",
+        type="bool",
+        default=False,
+        help="Whether to write the test steps in a NDJSON file, as they happen.",
+    )
+    parser.addini(
+        "step_pages",
+        type="bool",
+        default=False,
+        help="Whether to write the test steps of each test in a separate HTML page.",
+    )
+    parser.addini(
+        "log_overhead",
+        type="bool",
+        default=False,
+        help="Whether to measure the time spent by the plugin in each test step.",
+    )
+    parser.addini(
+        "buffer_size",
+        type="string",
+        default="10",
+        help="Number of test steps kept in memory with the 'buffer' screenshot strategy.",
+    )
+    parser.addini(
+        "screenshot_format",
+        type="string",
+        default="png",
+        help="Screenshot image format. Accepted values: png, jpeg or webp.",
+    )
+    parser.addini(
+        "screenshot_quality",
+        type="string",
+        default="80",
+        help="Compression quality (1-100) of jpeg and webp screenshots.",
+    )
+    parser.addini(
+        "screenshot_max_width",
+        type="string",
+        default="0",
+        help="Maximum width in pixels of screenshots. 0 means no limit.",
+    )
+    parser.addini(
+        "screenshot_grayscale",
+        type="bool",
+        default=False,
+        help="Whether to convert screenshots to grayscale.",
+    )
+    parser.addini(
+        "screenshot_thumbnail_width",
+        type="string",
+        default="0",
+        help="Width in pixels of the screenshot thumbnails displayed in the report. 0 means no thumbnails.",
+    )
+    parser.addini(
+        "deduplicate_screenshots",
+        type="bool",
+        default=False,
+        help="Whether to reuse the previous screenshot file when a new screenshot is identical.",
+    )
+    parser.addini(
+        "artifact_store",
+        type="string",
+        default="flat",
+        help="Screenshot and page source file layout. Accepted values: flat or content.",
+    )
+    parser.addini(
+        "page_source_compression",
+        type="string",
+        default="none",
+        help="Page source compression format. Accepted values: none, gzip or zstd.",
+    )
+    parser.addini(
+        "page_source_diff",
+        type="bool",
+        default=False,
+        help="Whether to only save the differences with the previous page source of the test.",
+    )
+
+
+# Used to store the next test to run
+next_item_key = pytest.StashKey()
+# Used to store the webdriver session pre-warming statistics
+prewarm_stats_key = pytest.StashKey()
+# Used to store the shared driver service statistics
+service_stats_key = pytest.StashKey()
+# Webdriver configuration parsed at configuration time
+config_data_key = pytest.StashKey()
+# Used to store the plugin overhead records of the pytest-xdist workers
+overhead_records_key = pytest.StashKey()
+# Used to store the number of webdriver errors logged by the pytest-xdist workers
+error_count_key = pytest.StashKey()
 
 
 #
@@ -177,6 +365,65 @@ def description_tag(request):
     return tag if tag in ("h1", "h2", "h3", "p", "pre") else "h2"
 
 
+@pytest.fixture(scope='session')
+def step_pages(request):
+    return request.config.getini("step_pages")
+
+
+@pytest.fixture(scope='session')
+def deduplicate_screenshots(request):
+    return request.config.getini("deduplicate_screenshots")
+
+
+@pytest.fixture(scope='session')
+def artifact_store(request):
+    store = request.config.getini("artifact_store")
+    return store if store in ("flat", "content") else "flat"
+
+
+@pytest.fixture(scope='session')
+def buffer_size(request):
+    try:
+        return int(utils.getini(request.config, "buffer_size"))
+    except (TypeError, ValueError):
+        return 10
+
+
+@pytest.fixture(scope='session')
+def thumbnail_width(request):
+    try:
+        width = int(utils.getini(request.config, "screenshot_thumbnail_width"))
+    except (TypeError, ValueError):
+        width = 0
+    if width > 0 and not imaging.has_pillow():
+        logger.append_driver_error("Screenshot thumbnails require the Pillow package. "
+                                   "Full-size screenshots will be displayed in the report.")
+        return 0
+    return max(width, 0)
+
+
+@pytest.fixture(scope='session')
+def step_log(request, report_folder):
+    if request.config.getini("log_steps") is not True:
+        yield None
+        return
+    filename = get_step_log_filename(report_folder)
+    try:
+        pathlib.Path(filename).parent.mkdir(parents=True, exist_ok=True)
+        log = StepLog(filename)
+    except Exception as e:
+        logger.append_driver_error(f"Error creating '{filename}' file", e)
+        yield None
+        return
+    yield log
+    log.close()
+
+
+@pytest.fixture(scope='session')
+def log_overhead(request):
+    return request.config.getini("log_overhead")
+
+
 @pytest.fixture(scope='session')
 def maximize_window(request):
     return request.config.getini("maximize_window")
@@ -220,9 +467,133 @@ def pause(request):
         return 0
 
 
+@pytest.fixture(scope='session')
+def pause_mode(request):
+    mode = utils.getini(request.config, "pause_mode")
+    return "adaptive" if mode is not None and mode.lower() == "adaptive" else "fixed"
+
+
+@pytest.fixture(scope='session')
+def pause_settle_time(request):
+    try:
+        return int(utils.getini(request.config, "pause_settle_time")) / 1000
+    except (TypeError, ValueError):
+        return 0.1
+
+
+@pytest.fixture(scope='session')
+def service_pool(request):
+    # Requested before the driver pool and the pre-warmer by _driver, so that it is closed after them
+    if request.config.getini("shared_driver_service") is not True:
+        yield None
+        return
+    pool = ServicePool()
+    request.config.stash[service_stats_key] = pool.stats
+    yield pool
+    pool.close()
+
+
+@pytest.fixture(scope='session')
+def driver_pool(request):
+    if request.config.getini("driver_pool") is not True:
+        yield None
+        return
+    try:
+        max_uses = int(utils.getini(request.config, "driver_pool_max_uses"))
+    except (TypeError, ValueError):
+        max_uses = 0
+    try:
+        max_memory = float(utils.getini(request.config, "driver_pool_max_memory"))
+    except (TypeError, ValueError):
+        max_memory = 0
+    pool = DriverPool(max_uses, max_memory)
+    yield pool
+    pool.close()
+
+
+@pytest.fixture(scope='session')
+def driver_prewarmer(request):
+    if request.config.getini("driver_prewarm") is not True:
+        yield None
+        return
+    prewarmer = DriverPrewarmer()
+    request.config.stash[prewarm_stats_key] = prewarmer.stats
+    yield prewarmer
+    prewarmer.close()
+
+
+@pytest.fixture(scope='session')
+def binary_paths_cache(request):
+    if request.config.getini("driver_paths_cache") is not True:
+        return None
+    return getattr(request.config, "cache", None)
+
+
+@pytest.fixture(scope='session')
+def artifact_writer(request):
+    try:
+        threads = int(utils.getini(request.config, "writer_threads"))
+    except (TypeError, ValueError):
+        threads = 2
+    try:
+        queue_size = int(utils.getini(request.config, "writer_queue_size"))
+    except (TypeError, ValueError):
+        queue_size = 32
+    writer = ArtifactWriter(threads, queue_size)
+    yield writer
+    writer.close()
+
+
+@pytest.fixture(scope='session')
+def screenshot_settings(request):
+    image_format = utils.getini(request.config, "screenshot_format")
+    image_format = image_format.lower() if image_format is not None else "png"
+    try:
+        quality = int(utils.getini(request.config, "screenshot_quality"))
+    except (TypeError, ValueError):
+        quality = 80
+    try:
+        max_width = int(utils.getini(request.config, "screenshot_max_width"))
+    except (TypeError, ValueError):
+        max_width = 0
+    grayscale = request.config.getini("screenshot_grayscale")
+    settings = imaging.get_settings(image_format, quality, max_width, grayscale)
+    if settings == imaging.get_settings():
+        return None
+    if not imaging.has_pillow():
+        logger.append_driver_error("The screenshot settings require the Pillow package. "
+                                   "Only the settings supported by the browser will be applied.")
+    return settings
+
+
+@pytest.fixture(scope='session')
+def page_source_settings(request):
+    compression = utils.getini(request.config, "page_source_compression")
+    if compression not in ("gzip", "zstd"):
+        compression = None
+    if compression == "zstd" and utils.zstd is None:
+        logger.append_driver_error("zstd compression requires Python 3.14 or the zstandard package. "
+                                   "Page sources will be compressed with gzip.")
+        compression = "gzip"
+    diff = request.config.getini("page_source_diff")
+    if compression is None and diff is not True:
+        return None
+    return {
+        'compression': compression,
+        'diff': diff,
+    }
+
+
 @pytest.fixture(scope="session")
 def config_data(request, driver_config):
-    return utils.load_json_yaml_file(driver_config)
+    if config_data_key in request.config.stash:
+        return request.config.stash[config_data_key]
+    return load_config(driver_config, getattr(request.config, "cache", None))
+
+
+@pytest.fixture(scope="session")
+def config_plans(request, config_data):
+    return compile_plans(config_data)
 
 
 @pytest.fixture(scope='session')
@@ -240,7 +611,9 @@ def driver_paths(request, driver_firefox, driver_chrome, driver_chromium, driver
 @pytest.fixture(scope='session')
 def check_options(request, browser, report_folder, driver_config):
     utils.check_browser_option(browser)
-    utils.create_assets(report_folder, driver_config)
+    # With pytest-xdist, the assets are created once by the controller
+    if not utils.is_xdist_worker(request.config):
+        utils.create_assets(report_folder, driver_config)
 
 
 #
@@ -262,16 +635,24 @@ def comments(request):
 
 
 @pytest.fixture(scope='function')
-def _driver(request, browser, report_folder, config_data, driver_config, driver_paths,
-            images, sources, comments, screenshots, pause, headless, maximize_window,
-            check_options, verbose, log_attributes, log_page_source):
+def _driver(request, browser, report_folder, config_plans, driver_config, driver_paths,
+            images, sources, comments, screenshots, pause, pause_mode, pause_settle_time,
+            headless, maximize_window, check_options, verbose, log_attributes, log_page_source,
+            service_pool, driver_pool, driver_prewarmer, artifact_writer, screenshot_settings, deduplicate_screenshots,
+            artifact_store, page_source_settings, buffer_size, thumbnail_width, log_overhead,
+            step_log, binary_paths_cache):
+    # Selenium webdriver modules are only imported by the tests using a webdriver
+    from .listener import CustomEventListener
+    from .wrappers import (
+        CustomEventFiringWebDriver,
+        wrap_driver,
+    )
 
     log_attributes = log_attributes or verbose
     log_page_source = log_page_source or verbose
 
     # Update settings from markers
     marker_window = markers.get_marker_window(request.node)
-    config_data.update({'window': marker_window})
 
     marker_screenshots = markers.get_marker_screenshots(request.node)
     if marker_screenshots is not None:
@@ -295,33 +676,30 @@ def _driver(request, browser, report_folder, config_data, driver_config, driver_
         log_page_source = marker_log_verbose
 
     # Instantiate webdriver
+    plan = config_plans.get(browser)
+    opt = browser_options(plan, marker_window, headless)
+    pool_key = get_pool_key(browser, opt, marker_window)
     driver = None
-    opt = browser_options(browser, config_data, headless)
-    srv = browser_service(browser, config_data, driver_paths)
-    try:
-        if browser == "firefox":
-            driver = WebDriver_Firefox(options=opt, service=srv)
-        elif browser == "chrome":
-            driver = WebDriver_Chrome(options=opt, service=srv)
-        elif browser == "chromium":
-            driver = WebDriver_Chromium(browser_name="Chromium", vendor_prefix="Chromium", options=opt, service=srv)
-        elif browser == "edge":
-            driver = WebDriver_Edge(options=opt, service=srv)
-        elif browser == "safari":
-            driver = WebDriver_Safari(options=opt, service=srv)
-    except:
-        if driver is not None:
-            try:
-                driver.quit()
-            except:
-                pass
-        raise
+    if driver_pool is not None:
+        driver = driver_pool.acquire(pool_key)
+    if driver is None and driver_prewarmer is not None:
+        driver = driver_prewarmer.take(pool_key)
+    if driver is None:
+        driver = _get_driver_factory(plan, opt, marker_window, driver_paths, binary_paths_cache, service_pool)()
+    if driver_pool is not None:
+        driver_pool.track(driver)
+
+    # Start the webdriver session of the next test
+    if driver_prewarmer is not None:
+        _prewarm_next_driver(request, driver_prewarmer, driver_pool, pool_key,
+                             browser, config_plans, driver_paths, headless, binary_paths_cache, service_pool)
 
     # Set driver metadata
-    wrap_driver(driver, screenshots, images, sources, comments, report_folder, log_attributes, log_page_source)
-
-    # Set capabilities
-    set_driver_capabilities(driver, browser, config_data)
+    wrap_driver(driver, screenshots, images, sources, comments, report_folder, log_attributes, log_page_source,
+                artifact_writer, screenshot_settings, deduplicate_screenshots, artifact_store,
+                page_source_settings, buffer_size, thumbnail_width)
+    instrumentation.init_timings(driver, log_overhead)
+    init_step_log(driver, step_log, request.node.nodeid)
 
     # Set window
     if (
@@ -341,12 +719,79 @@ def _driver(request, browser, report_folder, config_data, driver_config, driver_
         pause = marker_pause
 
     # Decorate driver
-    event_listener = CustomEventListener(pause)
+    event_listener = CustomEventListener(pause, pause_mode, pause_settle_time)
     wrapped_driver = CustomEventFiringWebDriver(driver, event_listener)
 
     yield wrapped_driver
 
-    wrapped_driver.quit()
+    request.node.user_properties.append(("selenium_plugin_commands", driver.plugin_commands))
+    record = instrumentation.record_test(request.node.nodeid, driver)
+    if record is not None:
+        request.node.user_properties.append(("selenium_overhead", json.dumps(record['timings'])))
+    artifact_writer.drain()
+    if driver_pool is not None:
+        driver_pool.release(pool_key, driver)
+    else:
+        wrapped_driver.quit()
+
+
+def _get_driver_factory(plan, options, window, driver_paths, paths_cache=None, services=None):
+    """ Returns a function starting a new webdriver session with the given settings. """
+    def new_service():
+        service = browser_service(plan, driver_paths)
+        set_binary_paths(plan.browser, options, service, paths_cache)
+        return service
+
+    def factory():
+        if services is None:
+            service = new_service()
+        else:
+            # The service is only built if no shared service is idle
+            service = services.acquire(get_service_key(plan, options, driver_paths), new_service)
+            set_binary_paths(plan.browser, options, service, paths_cache)
+        driver = _instantiate_driver(plan.browser, options, service)
+        # Set capabilities
+        set_driver_capabilities(driver, plan, window)
+        return driver
+    return factory
+
+
+def _prewarm_next_driver(request, prewarmer, pool, current_key, browser, plans, driver_paths, headless,
+                         paths_cache=None, services=None):
+    """ Starts in the background the webdriver session expected to be used by the next test. """
+    nextitem = request.node.stash.get(next_item_key, None)
+    if nextitem is None or "_driver" not in getattr(nextitem, "fixturenames", ()):
+        return
+    marker_browser = markers.get_marker_browser(nextitem)
+    if marker_browser is not None:
+        browser = marker_browser
+    marker_window = markers.get_marker_window(nextitem)
+    plan = plans.get(browser)
+    opt = browser_options(plan, marker_window, headless)
+    key = get_pool_key(browser, opt, marker_window)
+    # The current session will be reused by the next test
+    if pool is not None and (key == current_key or pool.has_idle(key)):
+        return
+    prewarmer.submit(key, _get_driver_factory(plan, opt, marker_window, driver_paths, paths_cache, services))
+
+
+def _instantiate_driver(browser, options, service):
+    """ Starts a new webdriver session for the given browser. """
+    driver = None
+    try:
+        webdriver_class = get_browser_class(browser, 'webdriver')
+        if browser == "chromium":
+            driver = webdriver_class(browser_name="Chromium", vendor_prefix="Chromium", options=options, service=service)
+        else:
+            driver = webdriver_class(options=options, service=service)
+    except:
+        if driver is not None:
+            try:
+                driver.quit()
+            except:
+                pass
+        raise
+    return driver
 
 
 @pytest.fixture(scope='function')
@@ -357,6 +802,12 @@ def webdriver(_driver):
 #
 # Hookers
 #
+@pytest.hookimpl(tryfirst=True)
+def pytest_runtest_protocol(item, nextitem):
+    """ Stores the next test to run, used to pre-warm its webdriver session. """
+    item.stash[next_item_key] = nextitem
+
+
 @pytest.hookimpl(hookwrapper=True)
 def pytest_runtest_makereport(item, call):
     """ Override report generation. """
@@ -368,6 +819,15 @@ def pytest_runtest_makereport(item, call):
     if not ("request" in item.funcargs and "browser" in item.funcargs):
         return
 
+    # The buffered steps are kept until the teardown, which can also fail
+    if report.when in ("setup", "teardown") and item.funcargs.get("webdriver") is not None:
+        driver = item.funcargs['webdriver']
+        if driver.screenshots == "buffer":
+            if report.failed:
+                _append_buffer_extras(report, driver, extras, pytest_html)
+            elif report.when == "teardown":
+                driver.buffer.clear()
+
     # Let's deal with the HTML report
     if report.when == 'call':
         # Get test fixture values
@@ -377,6 +837,7 @@ def pytest_runtest_makereport(item, call):
         sources = feature_request.getfixturevalue("sources")
         comments = feature_request.getfixturevalue("comments")
         description_tag = feature_request.getfixturevalue("description_tag")
+        step_pages = feature_request.getfixturevalue("step_pages")
         screenshots = driver.screenshots
         log_attributes = driver.log_attributes
         #log_page_source = driver.log_page_source
@@ -385,19 +846,32 @@ def pytest_runtest_makereport(item, call):
         description = item.function.__doc__ if hasattr(item, 'function') else None
         utils.append_header(call, report, extras, pytest_html, description, description_tag)
 
+        # Append the plugin overhead of the test execution
+        if driver.timings is not None:
+            extras.append(pytest_html.extras.html(
+                utils.decorate_overhead(driver.timings, len(driver.step_timings))
+            ))
+
         if screenshots == "none":
             return
 
+        # Wait for the pending screenshot and page source writes
+        with instrumentation.timer(driver, "report"):
+            utils.flush_artifacts(driver)
+
         if not utils.check_lists_length(report, item, driver):
             return
 
         # Generate HTML code for the extras to be added in the report
-        links = ""  # Used when logging without comments
-        rows = ""   # Used when logging with comments
+        thumbnails = driver.thumbnails
+        links = []  # Used when logging without comments
+        rows = []   # Used when logging with comments
+        final = None  # The last screenshot and page source of the test
+        if len(images) > 0:
+            final = (images[-1], sources[-1])
         if screenshots == "all" and not log_attributes:
             #if log_page_source:
-                for i in range(len(images)):
-                    links += utils.decorate_anchors(images[i], sources[i])
+                utils.append_anchors(links, images, sources, thumbnails, driver.waits)
             #else:
             #    for img in images:
             #        extras.append(pytest_html.extras.png(img))
@@ -405,48 +879,79 @@ def pytest_runtest_makereport(item, call):
             screenshots == "manual"
             or (screenshots == "all" and log_attributes)
         ):
-            for i in range(len(images)):
-                rows += utils.get_table_row_tag(comments[i], images[i], sources[i])
+            utils.append_table_rows(rows, comments, images, sources, thumbnails)
+        elif screenshots == "buffer":
+            xfail = hasattr(report, 'wasxfail')
+            if report.outcome == "failed" or (xfail and report.outcome == "passed"):
+                buffer_images, buffer_sources, buffer_comments = utils.save_buffer(driver, driver.report_folder)
+                resources = utils.save_resources(driver, driver.report_folder)
+                final = resources
+                if log_attributes:
+                    utils.append_table_rows(rows, buffer_comments, buffer_images, buffer_sources, thumbnails)
+                    rows.append(utils.get_table_row_tag(
+                                    "Last screenshot before failure",
+                                    resources[0], resources[1],
+                                    clazz="selenium_log_description",
+                                    thumbnail=thumbnails.get(resources[0])
+                                ))
+                else:
+                    buffer_images.append(resources[0])
+                    buffer_sources.append(resources[1])
+                    utils.append_anchors(links, buffer_images, buffer_sources, thumbnails, driver.waits)
         elif screenshots == "last":
             resources = utils.save_resources(driver, driver.report_folder)
             #if log_page_source:
-            links = utils.decorate_anchors(resources[0], resources[1])
+            links = [utils.decorate_anchors(resources[0], resources[1],
+                                            thumbnail=thumbnails.get(resources[0]))]
             #else:
             #    extras.append(pytest_html.extras.png(resources[0]))
         if screenshots in ("failed", "manual"):
             xfail = hasattr(report, 'wasxfail')
             if xfail or report.outcome in ("failed", "skipped"):
                 resources = utils.save_resources(driver, driver.report_folder)
+                final = resources
                 if screenshots == "manual":
                     if xfail or report.outcome == "failed":
                         event = "failure"
                     else:
                         event = "skip"
-                    rows += utils.get_table_row_tag(
-                                f"Last screenshot before {event}",
-                                resources[0], resources[1],
-                                clazz="selenium_log_description"
-                            )
+                    rows.append(utils.get_table_row_tag(
+                                    f"Last screenshot before {event}",
+                                    resources[0], resources[1],
+                                    clazz="selenium_log_description",
+                                    thumbnail=thumbnails.get(resources[0])
+                                ))
                 else:
                     #if log_page_source:
-                        links = utils.decorate_anchors(resources[0], resources[1])
+                        links = [utils.decorate_anchors(resources[0], resources[1],
+                                                        thumbnail=thumbnails.get(resources[0]))]
                     #else:
                     #    extras.append(pytest_html.extras.png(resources[0]))
 
+        # Move the test steps to a separate page.
+        # Only the link to the page and the last screenshot are kept in the report.
+        if step_pages and screenshots in ("all", "manual", "buffer") and len(links) + len(rows) > 0:
+            with instrumentation.timer(driver, "report"):
+                page = utils.write_steps_page(driver.report_folder, item.nodeid, links, rows)
+            # The test steps stay in the report if the page couldn't be written
+            if page is not None:
+                links = [utils.decorate_steps_page(page, len(links) + len(rows))]
+                if final is not None:
+                    links.append("<br>" + utils.decorate_anchors(final[0], final[1],
+                                                                 thumbnail=thumbnails.get(final[0])))
+                rows = []
+
         # Add horizontal line between the header and the comments/screenshots
         if len(extras) > 0 and len(links) + len(rows) > 0:
             extras.append(pytest_html.extras.html(f'<hr class="selenium_separator">'))
 
         # Append extras
-        if links != "":
-            extras.append(pytest_html.extras.html(links))
-        if rows != "":
-            rows = (
-                '<table style="width: 100%;">'
-                + rows +
-                "</table>"
-            )
-            extras.append(pytest_html.extras.html(rows))
+        if len(links) > 0:
+            extras.append(pytest_html.extras.html("".join(links)))
+        if len(rows) > 0:
+            rows.insert(0, '<table style="width: 100%;">')
+            rows.append("</table>")
+            extras.append(pytest_html.extras.html("".join(rows)))
         report.extras = extras
 
         # Check if there was a screenshot gathering failure
@@ -458,8 +963,41 @@ def pytest_runtest_makereport(item, call):
                     break
 
 
+def _append_buffer_extras(report, driver, extras, pytest_html):
+    """ Saves the buffered steps of a test failing in a fixture setup or teardown, and appends them to the report. """
+    if len(driver.buffer) == 0:
+        return
+    images, sources, comments = utils.save_buffer(driver, driver.report_folder)
+    thumbnails = driver.thumbnails
+    if driver.log_attributes:
+        rows = ['<table style="width: 100%;">']
+        utils.append_table_rows(rows, comments, images, sources, thumbnails)
+        rows.append("</table>")
+        content = "".join(rows)
+    else:
+        content = "".join(utils.append_anchors([], images, sources, thumbnails, driver.waits))
+    if len(extras) > 0:
+        extras.append(pytest_html.extras.html(f'<hr class="selenium_separator">'))
+    extras.append(pytest_html.extras.html(content))
+    report.extras = extras
+
+
 @pytest.hookimpl(trylast=False)
 def pytest_configure(config):
+    # Configure the webdriver log file
+    try:
+        max_size = float(utils.getini(config, "webdriver_log_max_size"))
+    except (TypeError, ValueError):
+        max_size = 0
+    try:
+        buffer_size = int(utils.getini(config, "webdriver_log_buffer_size"))
+    except (TypeError, ValueError):
+        buffer_size = 32
+    logger.configure(utils.getini(config, "webdriver_log_format"), int(max_size * 1024 * 1024), buffer_size)
+
+    # Parse the webdriver configuration once for the whole session
+    config.stash[config_data_key] = load_config(utils.getini(config, "driver_config"), getattr(config, "cache", None))
+
     # Register custom markers
     config.addinivalue_line("markers", "browser(arg)")
     config.addinivalue_line("markers", "pause(arg)")
@@ -484,9 +1022,16 @@ def pytest_configure(config):
             metadata['Headless'] = str(headless).lower()
             metadata['Screenshots'] = screenshots
             metadata['Pause'] = pause + " second(s)"
+            if utils.getini(config, "pause_mode") == "adaptive":
+                metadata['Pause'] += " (adaptive)"
             metadata['Selenium'] = version("selenium")
             if driver_config is not None and os.path.isfile(driver_config):
-                if utils.load_json_yaml_file(driver_config) != {}:
+                if config.stash[config_data_key] != {} and len(get_config_errors(driver_config)) > 0:
+                    metadata["Driver configuration"] = (
+                        f'<a href="{driver_config}">{driver_config}</a>'
+                        f'<span style="color:orange;"> (partially invalid)</span>'
+                    )
+                elif config.stash[config_data_key] != {}:
                     metadata["Driver configuration"] = (
                         f'<a href="{driver_config}">{driver_config}</a>'
                         f'<span style="color:green;"> (valid)</span>'
@@ -507,6 +1052,98 @@ def pytest_configure(config):
     report_css.insert(0, style_css)
 
 
+@pytest.hookimpl(tryfirst=True)
+def pytest_sessionstart(session):
+    """ With pytest-xdist, creates the assets once in the controller before the workers start. """
+    config = session.config
+    if utils.is_xdist_controller(config) and config.getoption("browser") is not None:
+        report_folder = utils.get_folder(config.getoption("--html"))
+        utils.create_assets(report_folder, utils.getini(config, "driver_config"))
+
+
+def pytest_sessionfinish(session, exitstatus):
+    """
+    Writes the plugin overhead summary and the pending webdriver log records.
+    Sends the pytest-xdist worker statistics to the controller.
+    """
+    config = session.config
+    # The controller merges the records of the pytest-xdist workers
+    records = instrumentation.records + config.stash.get(overhead_records_key, [])
+    if len(records) > 0:
+        folder = utils.get_folder(config.getoption("--html", None))
+        worker = utils.get_worker_id()
+        filename = "overhead.json" if worker is None else f"overhead-{worker}.json"
+        if folder is not None and folder != '':
+            filename = f"{folder}{os.sep}{filename}"
+        try:
+            instrumentation.write_summary(filename, records)
+        except Exception as e:
+            logger.append_driver_error(f"Error writing '{filename}' file", e)
+    if utils.is_xdist_worker(config):
+        if prewarm_stats_key in config.stash:
+            config.workeroutput['selenium_auto_prewarm'] = config.stash[prewarm_stats_key]
+        if service_stats_key in config.stash:
+            config.workeroutput['selenium_auto_services'] = config.stash[service_stats_key]
+        config.workeroutput['selenium_auto_overhead'] = [
+            {key: record[key] for key in ('nodeid', 'total', 'timings')}
+            for record in instrumentation.records
+        ]
+        config.workeroutput['selenium_auto_errors'] = logger.error_count
+    logger.flush()
+
+
+@pytest.hookimpl(optionalhook=True)
+def pytest_testnodedown(node, error):
+    """ Merges the pytest-xdist worker statistics in the controller. """
+    workeroutput = getattr(node, "workeroutput", {})
+    node.config.stash.setdefault(overhead_records_key, []).extend(
+        workeroutput.get('selenium_auto_overhead', [])
+    )
+    node.config.stash[error_count_key] = (
+        node.config.stash.get(error_count_key, 0) + workeroutput.get('selenium_auto_errors', 0)
+    )
+    for name, stats_key in (('selenium_auto_prewarm', prewarm_stats_key), ('selenium_auto_services', service_stats_key)):
+        worker_stats = workeroutput.get(name, None)
+        if worker_stats is None:
+            continue
+        stats = node.config.stash.setdefault(stats_key, {})
+        for key, value in worker_stats.items():
+            stats[key] = stats.get(key, 0) + value
+
+
+def pytest_terminal_summary(terminalreporter, exitstatus, config):
+    stats = config.stash.get(prewarm_stats_key, None)
+    if stats is not None and stats.get('launched', 0) > 0:
+        terminalreporter.write_sep('-', "pytest-selenium-auto: webdriver session pre-warming")
+        terminalreporter.write_line(
+            f"{stats['launched']} session(s) pre-warmed, {stats['used']} used. "
+            f"{stats['hidden_time']:.2f}s of {stats['launch_time']:.2f}s start-up time hidden."
+        )
+    stats = config.stash.get(service_stats_key, None)
+    if stats is not None and stats.get('started', 0) > 0:
+        terminalreporter.write_sep('-', "pytest-selenium-auto: shared driver services")
+        terminalreporter.write_line(
+            f"{stats['started']} service(s) started, {stats['reused']} reused by a new webdriver session."
+        )
+    records = instrumentation.records + config.stash.get(overhead_records_key, [])
+    if len(records) > 0:
+        summary = instrumentation.get_summary(records)
+        terminalreporter.write_sep('-', "pytest-selenium-auto: plugin overhead")
+        terminalreporter.write_line(
+            f"{summary['total']:.3f}s in {summary['tests']} test(s) "
+            f"({instrumentation.format_timings(summary['categories'])})"
+        )
+        terminalreporter.write_line("Top overhead contributors:")
+        for record in sorted(records, key=lambda r: r['total'], reverse=True)[:5]:
+            terminalreporter.write_line(
+                f"  {record['total']:.3f}s  {record['nodeid']}  ({instrumentation.format_timings(record['timings'])})"
+            )
+    errors = logger.error_count + config.stash.get(error_count_key, 0)
+    if errors > 0:
+        terminalreporter.write_sep('-', "pytest-selenium-auto: webdriver errors")
+        terminalreporter.write_line(f"{errors} error(s) logged. See the log files in the 'logs' folder.")
+
+
 '''
 def pytest_terminal_summary(terminalreporter, exitstatus, config):
     for item in terminalreporter.stats.items():
@@ -0,0 +1,106 @@
+import json
+import os
+import threading
+import time
+from . import utils
+
+
+class StepLog:
+    """
+    Machine-readable log of the test steps.
+
+    Each test step is appended to a NDJSON file (one JSON record per line) as soon as it is logged.
+    Each pytest-xdist worker writes its own file.
+    """
+
+    def __init__(self, filename):
+        """
+        Args:
+            filename (str): The NDJSON file path.
+        """
+        self.filename = filename
+        self._lock = threading.Lock()
+        self._file = open(filename, 'w', encoding="utf-8", buffering=1)
+
+    def append(self, record):
+        """ Appends a record to the log file. """
+        line = json.dumps(record, ensure_ascii=False, default=str)
+        with self._lock:
+            if self._file is not None:
+                self._file.write(line + "\n")
+
+    def close(self):
+        with self._lock:
+            if self._file is not None:
+                self._file.close()
+                self._file = None
+
+
+def get_step_log_filename(report_folder):
+    """ Returns the step log file path. Each pytest-xdist worker has its own file. """
+    worker = utils.get_worker_id()
+    filename = "steps.ndjson" if worker is None else f"steps-{worker}.ndjson"
+    if report_folder is not None and report_folder != '':
+        filename = f"{report_folder}{os.sep}{filename}"
+    return filename
+
+
+def init_step_log(driver, log, nodeid):
+    """
+    Adds the step log metadata to a webdriver.
+
+    Args:
+        driver (WebDriver): The webdriver.
+
+        log (StepLog): The step log, or None if the test steps are not logged.
+
+        nodeid (str): The test node id.
+    """
+    setattr(driver, "step_log", log)
+    setattr(driver, "step_log_nodeid", nodeid)
+    setattr(driver, "step_log_count", 0)
+    setattr(driver, "step_start", None)
+    setattr(driver, "step_digests", {})
+
+
+def start_step(driver):
+    """ Records the start time of a test step. """
+    if getattr(driver, "step_log", None) is not None:
+        driver.step_start = time.time()
+
+
+def log_step(driver, comment, image=None, source=None):
+    """
+    Appends a test step to the step log.
+
+    Args:
+        driver (WebDriver): The webdriver.
+
+        comment (dict): The comment of the test step.
+
+        image (str): The screenshot filename, if any.
+
+        source (str): The page source filename, if any.
+    """
+    log = getattr(driver, "step_log", None)
+    if log is None:
+        return
+    end = time.time()
+    start = driver.step_start if driver.step_start is not None else end
+    driver.step_log_count += 1
+    digests = driver.step_digests
+    log.append({
+        'nodeid': driver.step_log_nodeid,
+        'worker': utils.get_worker_id(),
+        'step': driver.step_log_count,
+        'start': start,
+        'end': end,
+        'duration': end - start,
+        'description': comment,
+        'screenshot': image,
+        'screenshot_digest': digests.get('screenshot') if image is not None else None,
+        'page_source': source,
+        'page_source_digest': digests.get('page_source') if source is not None else None,
+    })
+    driver.step_start = None
+    digests.clear()
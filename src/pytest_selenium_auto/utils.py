@@ -1,30 +1,79 @@
 import base64
+import contextlib
+import difflib
+import functools
+import gzip
+import hashlib
 import json
 import os
 import pathlib
 import pytest
+import re
 import shutil
 import sys
+import threading
 import traceback
-import yaml
+import types
 # from lxml import etree, html
-from . import logger
-from selenium.webdriver.chrome.webdriver   import WebDriver as WebDriver_Chrome
-from selenium.webdriver.chromium.webdriver import ChromiumDriver as WebDriver_Chromium
-from selenium.webdriver.edge.webdriver     import WebDriver as WebDriver_Edge
+from . import (
+    imaging,
+    instrumentation,
+    logger,
+)
+try:
+    from compression import zstd
+except ImportError:
+    try:
+        import zstandard as zstd
+    except ImportError:
+        zstd = None
 
 
 # Counter used for image and page source files naming
 count = 0
 
+# Files of the content-addressed artifact store already written or scheduled
+stored = set()
+
+# Size of the chunks written to page source files
+chunk_size = 1024 * 1024
+
 
 def counter():
-    """ Returns a suffix used for image and page source file naming """
+    """
+    Returns a suffix used for image and page source file naming.
+    When running in a pytest-xdist worker, the suffix is prefixed with the worker id.
+    """
     global count
     count += 1
+    worker = get_worker_id()
+    if worker is not None:
+        return f"{worker}-{count}"
     return count
 
 
+#
+# Auxiliary functions for pytest-xdist
+#
+def get_worker_id():
+    """ Returns the id of the current pytest-xdist worker, or None if not running in a worker. """
+    return os.environ.get("PYTEST_XDIST_WORKER")
+
+
+def is_xdist_worker(config):
+    """ Whether the pytest configuration belongs to a pytest-xdist worker. """
+    return hasattr(config, "workerinput")
+
+
+def is_xdist_controller(config):
+    """ Whether the pytest configuration belongs to a pytest-xdist controller distributing tests to workers. """
+    return (
+        not is_xdist_worker(config)
+        and config.pluginmanager.hasplugin("xdist")
+        and config.getoption("dist", "no") != "no"
+    )
+
+
 #
 # Auxiliary functions to check options and fixtures
 #
@@ -75,7 +124,7 @@ def check_lists_length(report, item, driver):
     """ Used to verify if the images, comments and page sources lists have coherent lenghts. """
     message = ('"images", "comments" and/or "sources" lists have incoherent lengths. '
                "Screenshots won't be logged for this test.")
-    if driver.screenshots in ('last', 'failed', 'none'):
+    if driver.screenshots in ('last', 'failed', 'buffer', 'none'):
         return True
     if len(driver.images) != len(driver.sources):
         log_error_message(report, item, message)
@@ -99,6 +148,8 @@ def create_assets(report_folder, driver_config):
     # Create screenshots folder
     shutil.rmtree(f"{folder}screenshots", ignore_errors=True)
     pathlib.Path(f"{folder}screenshots").mkdir(parents=True)
+    # Remove test steps pages folder
+    shutil.rmtree(f"{folder}steps", ignore_errors=True)
     # Copy error.png to screenshots folder
     resources_path = pathlib.Path(__file__).parent.joinpath("resources")
     error_img = pathlib.Path(resources_path, "error.png")
@@ -110,6 +161,24 @@ def create_assets(report_folder, driver_config):
     logger.init()
 
 
+def freeze(data):
+    """ Returns a read-only copy of a dictionary loaded from a JSON/YAML file. Lists are converted to tuples. """
+    if isinstance(data, dict):
+        return types.MappingProxyType({key: freeze(value) for key, value in data.items()})
+    if isinstance(data, (list, tuple)):
+        return tuple(freeze(value) for value in data)
+    return data
+
+
+def thaw(data):
+    """ Returns a mutable copy of a read-only dictionary returned by freeze. """
+    if isinstance(data, (dict, types.MappingProxyType)):
+        return {key: thaw(value) for key, value in data.items()}
+    if isinstance(data, (list, tuple)):
+        return [thaw(value) for value in data]
+    return data
+
+
 def load_json_yaml_file(filename):
     """
     Loads a json/xml file into a dictionary.
@@ -132,8 +201,11 @@ def load_json_yaml_file(filename):
                 return {}
         elif filename.endswith('.yaml') or filename.endswith('.yml'):
             try:
+                import yaml
+                # The C loader is only available when PyYAML is built with libyaml
+                loader = getattr(yaml, "CSafeLoader", yaml.SafeLoader)
                 f = open(filename)
-                data = yaml.safe_load(f)
+                data = yaml.load(f, Loader=loader)
                 f.close()
                 return data
             except Exception as e:
@@ -162,36 +234,141 @@ def save_resources(driver, report_folder):
         tuple: The HTML anchor link for the screenshot and the page source.
     """
     index = counter()
-    image = save_screenshot(driver, report_folder, index)
-    source = None
-    if driver.log_page_source:
-        source = save_page_source(driver, report_folder, index)
+    with plugin_commands(driver):
+        image = save_screenshot(driver, report_folder, index)
+        source = None
+        if driver.log_page_source:
+            source = save_page_source(driver, report_folder, index)
+    # The links are used right away in the report
+    failed = flush_writer(driver)
+    if image in failed:
+        image = f"screenshots{os.sep}error.png"
+    if source in failed:
+        source = None
     return image, source
 
 
+def save_buffer(driver, report_folder):
+    """
+    Saves the test steps kept in the webdriver ring buffer and empties it.
+    The adaptive waits of the steps are recorded by screenshot position in the webdriver metadata.
+
+    Returns:
+        (list[str], list[str], list[dict]): The screenshot filenames, page source filenames and comments.
+    """
+    images = []
+    sources = []
+    comments = []
+    waits = {}
+    while len(driver.buffer) > 0:
+        step = driver.buffer.popleft()
+        index = counter()
+        if step['screenshot'] is not None:
+            images.append(store_screenshot(driver, report_folder, index, *step['screenshot']))
+        else:
+            images.append(f"screenshots{os.sep}error.png")
+        if step['source'] is not None:
+            sources.append(store_page_source(driver, report_folder, index, step['source']))
+        else:
+            sources.append(None)
+        comments.append(step['comment'])
+        if step.get('wait') is not None:
+            waits[len(images) - 1] = step['wait']
+    driver.waits = waits
+    # The links are used right away in the report
+    failed = flush_writer(driver)
+    images = [f"screenshots{os.sep}error.png" if img in failed else img for img in images]
+    sources = [None if src in failed else src for src in sources]
+    return images, sources, comments
+
+
 def save_screenshot(driver, report_folder, index):
     """
     Save a screenshot in 'screenshots' folder under the specified folder.
+    The file is written by the webdriver artifact writer, if any.
     
     Returns:
         str: The filename for the anchor link.
     """
-    link = f"screenshots{os.sep}image-{index}.png"
+    with instrumentation.timer(driver, "screenshot"):
+        try:
+            data, data_format = get_screenshot_data(driver, getattr(driver, "screenshot_settings", None))
+        except Exception as e:
+            trace = traceback.format_exc()
+            print(f"{str(e)}\n\n{trace}", file=sys.stderr)
+            return f"screenshots{os.sep}error.png"
+        return store_screenshot(driver, report_folder, index, data, data_format)
+
+
+def store_screenshot(driver, report_folder, index, data, data_format):
+    """
+    Saves a captured screenshot in 'screenshots' folder under the specified folder.
+    The file is written by the webdriver artifact writer, if any.
+
+    Args:
+        driver (WebDriver): The webdriver.
+
+        report_folder (str): The folder destination.
+
+        index (int | str): The suffix for the file naming.
+
+        data (str): The base64-encoded image.
+
+        data_format (str): The format of the image.
+
+    Returns:
+        str: The filename for the anchor link.
+    """
+    settings = getattr(driver, "screenshot_settings", None)
     folder = ""
     if report_folder is not None and report_folder != '':
         folder = f"{report_folder}{os.sep}"
-    filename = folder + link
     try:
-        if hasattr(driver, "save_full_page_screenshot"):
-            driver.save_full_page_screenshot(filename)
+        # Is this screenshot identical to the previous one?
+        # Then, reuse the previous file.
+        digest = None
+        # The step log records the digest of the screenshots
+        if getattr(driver, "step_log", None) is not None:
+            digest = get_digest(data)
+            driver.step_digests['screenshot'] = digest
+        if getattr(driver, "deduplicate", False):
+            if digest is None:
+                digest = get_digest(data)
+            previous = getattr(driver, "last_screenshot", None)
+            if previous is not None and previous[0] == digest:
+                link = previous[1]
+                return link
+        extension = imaging.get_extension(settings, data_format)
+        content_store = getattr(driver, "artifact_store", "flat") == "content"
+        if content_store:
+            if digest is None:
+                digest = get_digest(data)
+            link = get_content_link("screenshots", digest, extension)
         else:
-            if type(driver) in (WebDriver_Chrome, WebDriver_Chromium, WebDriver_Edge):
-                try:
-                    save_full_page_chromium(driver, filename)
-                except:
-                    driver.save_screenshot(filename)
+            link = f"screenshots{os.sep}image-{index}.{extension}"
+        filename = folder + link
+        thumbnail = None
+        thumbnail_width = getattr(driver, "thumbnail_width", 0)
+        if thumbnail_width > 0 and imaging.has_pillow():
+            thumbnail = get_thumbnail_link(link)
+        # Is this screenshot already in the content-addressed store?
+        if not (content_store and link in stored):
+            write = write_screenshot
+            write_thumb = write_thumbnail
+            if content_store:
+                stored.add(link)
+                write = functools.partial(write_once, write_screenshot)
+                write_thumb = functools.partial(write_once, write_thumbnail)
+            if imaging.needs_conversion(settings, data_format):
+                _submit_write(driver, link, write, data, filename, settings)
             else:
-                driver.save_screenshot(filename)
+                _submit_write(driver, link, write, data, filename)
+            if thumbnail is not None:
+                _submit_write(driver, thumbnail, write_thumb, data, folder + thumbnail, thumbnail_width)
+        if thumbnail is not None:
+            driver.thumbnails[link] = thumbnail
+        if digest is not None:
+            driver.last_screenshot = (digest, link)
     except Exception as e:
         trace = traceback.format_exc()
         link = f"screenshots{os.sep}error.png"
@@ -200,28 +377,115 @@ def save_screenshot(driver, report_folder, index):
         return link
 
 
-def save_full_page_chromium(driver, filename):
+def get_digest(data):
+    """ Returns the hexadecimal digest of captured data. """
+    if isinstance(data, str):
+        data = data.encode("utf-8")
+    return hashlib.blake2b(data, digest_size=16).hexdigest()
+
+
+def get_content_link(folder, digest, extension):
+    """
+    Returns the filename of an artifact in the content-addressed store.
+    Files are named by digest and sharded in subfolders named by the first two digest characters.
+
+    Args:
+        folder (str): The artifact folder: 'screenshots' or 'sources'.
+
+        digest (str): The digest of the artifact content.
+
+        extension (str): The file extension.
+    """
+    return f"{folder}{os.sep}{digest[:2]}{os.sep}{digest}.{extension}"
+
+
+def get_thumbnail_link(link):
+    """ Returns the filename of the thumbnail of a screenshot. """
+    return f"{os.path.splitext(link)[0]}.thumb.jpg"
+
+
+def get_screenshot_data(driver, settings=None):
+    """
+    Takes a screenshot, full-page if the browser supports it.
+
+    Args:
+        driver (WebDriver): The webdriver.
+
+        settings (dict): The screenshot settings.
+
+    Returns:
+        (str, str): The base64-encoded image and its format.
+    """
+    if hasattr(driver, "get_full_page_screenshot_as_base64"):
+        return driver.get_full_page_screenshot_as_base64(), "png"
+    # The webdriver module is already imported at this point
+    from selenium.webdriver.chromium.webdriver import ChromiumDriver
+    if isinstance(driver, ChromiumDriver):
+        try:
+            return get_full_page_chromium(driver, settings)
+        except:
+            pass
+    return driver.get_screenshot_as_base64(), "png"
+
+
+def get_full_page_chromium(driver, settings=None):
+    """
+    Takes a full-page screenshot with the Chrome DevTools Protocol.
+    The image format and the maximum width of the screenshot settings are applied by the browser.
+
+    Returns:
+        (str, str): The base64-encoded image and its format.
+    """
+    image_format = "png"
+    if settings is not None:
+        image_format = settings['format']
     #get window size
     page_rect = driver.execute_cdp_cmd("Page.getLayoutMetrics", {})
+    width = page_rect['contentSize']['width']
+    scale = 1
+    if settings is not None and 0 < settings['max_width'] < width:
+        scale = settings['max_width'] / width
     # parameters needed for full page screenshot
     # note we are setting the width and height of the viewport to screenshot, same as the site's content size
     screenshot_config = {
         'captureBeyondViewport': True,
         'fromSurface': True,
-        'format': "png",
+        'format': image_format,
         'clip': {
             'x': 0,
             'y': 0,
-            'width': page_rect['contentSize']['width'],
+            'width': width,
             'height': page_rect['contentSize']['height'],
-            'scale': 1,
+            'scale': scale,
         },
     }
+    if image_format != "png":
+        screenshot_config['quality'] = settings['quality']
     # Dictionary with 1 key: data
-    base_64_png = driver.execute_cdp_cmd("Page.captureScreenshot", screenshot_config)
-    # Write image to file
+    base_64_image = driver.execute_cdp_cmd("Page.captureScreenshot", screenshot_config)
+    return base_64_image['data'], image_format
+
+
+def write_screenshot(data, filename, settings=None):
+    """
+    Decodes a base64-encoded image and writes it to a file.
+    The image is re-encoded if screenshot settings are provided.
+    """
+    content = base64.b64decode(data)
+    if settings is not None:
+        content = imaging.convert(content, settings)
+    pathlib.Path(filename).parent.mkdir(parents=True, exist_ok=True)
     f = open(filename, "wb")
-    f.write(base64.urlsafe_b64decode(base_64_png['data']))
+    f.write(content)
+    f.close()
+
+
+def write_thumbnail(data, filename, width):
+    """ Decodes a base64-encoded image and writes its thumbnail to a file. """
+    content = imaging.thumbnail(base64.b64decode(data), width)
+    pathlib.Path(filename).parent.mkdir(parents=True, exist_ok=True)
+    f = open(filename, "wb")
+    f.write(content)
     f.close()
 
 
@@ -229,22 +493,71 @@ def save_page_source(driver, report_folder, index):
     """
     Saves the HTML page source with TXT extension
     in 'sources' folder under the specified folder.
+    The file is written by the webdriver artifact writer, if any.
     
     Returns:
         str: The filename for the anchor link.
     """
-    link = f"sources{os.sep}page-{index}.txt"
+    with instrumentation.timer(driver, "page_source"):
+        try:
+            source = driver.page_source
+        except Exception as e:
+            trace = traceback.format_exc()
+            print(f"{str(e)}\n\n{trace}", file=sys.stderr)
+            return None
+        return store_page_source(driver, report_folder, index, source)
+
+
+def store_page_source(driver, report_folder, index, source):
+    """
+    Saves a captured page source in 'sources' folder under the specified folder.
+    The file is written by the webdriver artifact writer, if any.
+
+    Args:
+        driver (WebDriver): The webdriver.
+
+        report_folder (str): The folder destination.
+
+        index (int | str): The suffix for the file naming.
+
+        source (str): The page source.
+
+    Returns:
+        str: The filename for the anchor link.
+    """
+    settings = getattr(driver, "page_source_settings", None)
+    compression = settings['compression'] if settings is not None else None
+    diff = settings is not None and settings['diff']
     folder = ""
     if report_folder is not None and report_folder != '':
         folder = f"{report_folder}{os.sep}"
-    filename = folder + link
     try:
-        source = driver.page_source
-        # document_root = html.fromstring(source)
-        # source = etree.tostring(document_root, encoding='unicode', pretty_print=True)
-        f = open(filename, 'w', encoding="utf-8")
-        f.write(source)
-        f.close()
+        previous = None
+        digest = None
+        write = write_page_source
+        # The step log records the digest of the page sources
+        if getattr(driver, "step_log", None) is not None:
+            digest = get_digest(source)
+            driver.step_digests['page_source'] = digest
+        if getattr(driver, "artifact_store", "flat") == "content":
+            extension = get_page_source_extension(compression)
+            if digest is None:
+                digest = get_digest(source)
+            link = get_content_link("sources", digest, extension)
+            if link in stored:
+                return link
+            stored.add(link)
+            write = functools.partial(write_once, write_page_source)
+        else:
+            # Is there a previous page source in this test?
+            # Then, only save the differences.
+            if diff:
+                previous = getattr(driver, "last_source", None)
+                driver.last_source = source
+            extension = get_page_source_extension(compression, previous is not None)
+            link = f"sources{os.sep}page-{index}.{extension}"
+        filename = folder + link
+        _submit_write(driver, link, write, source, filename, compression, previous)
     except Exception as e:
         trace = traceback.format_exc()
         link = None
@@ -253,6 +566,126 @@ def save_page_source(driver, report_folder, index):
         return link
 
 
+def get_page_source_extension(compression=None, diff=False):
+    """
+    Returns the file extension of a page source.
+
+    Args:
+        compression (str): The compression format: gzip, zstd or None.
+
+        diff (bool): Whether the file contains the differences with the previous page source.
+    """
+    extension = "diff" if diff else "txt"
+    if compression == "gzip":
+        extension += ".gz"
+    elif compression == "zstd":
+        extension += ".zst"
+    return extension
+
+
+def write_page_source(source, filename, compression=None, previous=None):
+    """
+    Writes a page source to a file.
+
+    Args:
+        source (str): The page source.
+
+        filename (str): The file path.
+
+        compression (str): The compression format: gzip, zstd or None.
+
+        previous (str): The previous page source. If provided, only the differences are written.
+    """
+    # document_root = html.fromstring(source)
+    # source = etree.tostring(document_root, encoding='unicode', pretty_print=True)
+    if previous is not None:
+        source = "".join(difflib.unified_diff(
+            previous.splitlines(keepends=True),
+            source.splitlines(keepends=True),
+            "previous", "current"
+        ))
+    pathlib.Path(filename).parent.mkdir(parents=True, exist_ok=True)
+    if compression == "gzip":
+        f = gzip.open(filename, 'wt', encoding="utf-8")
+    elif compression == "zstd":
+        f = zstd.open(filename, 'wt', encoding="utf-8")
+    else:
+        f = open(filename, 'w', encoding="utf-8")
+    # Write by chunks to avoid encoding the whole page source at once
+    for i in range(0, len(source), chunk_size):
+        f.write(source[i: i + chunk_size])
+    f.close()
+
+
+def write_once(func, content, filename, *args):
+    """
+    Writes a file of the content-addressed artifact store, shared by the tests and the pytest-xdist workers.
+    The write is skipped if the file exists, as its name identifies its content.
+    The content is written in a temporary file renamed once complete, so the file is never seen partially written.
+
+    Args:
+        func (Callable): The artifact write function, taking the content and the filename as first arguments.
+
+        content (str): The artifact content.
+
+        filename (str): The file path.
+    """
+    if os.path.isfile(filename):
+        return
+    pathlib.Path(filename).parent.mkdir(parents=True, exist_ok=True)
+    # Unique per process and thread, in the same folder so that the rename is atomic
+    temp = f"{filename}.{os.getpid()}-{threading.get_ident()}.tmp"
+    try:
+        func(content, temp, *args)
+        os.replace(temp, filename)
+    except BaseException:
+        try:
+            os.remove(temp)
+        except OSError:
+            pass
+        raise
+
+
+def _submit_write(driver, link, func, *args):
+    """ Writes an artifact with the webdriver artifact writer, or synchronously if there is none. """
+    writer = getattr(driver, "writer", None)
+    if writer is not None:
+        writer.submit(link, func, *args)
+    else:
+        func(*args)
+
+
+def flush_writer(driver):
+    """
+    Waits for the pending artifact writes of a webdriver.
+
+    Returns:
+        set[str]: The filenames of the failed writes.
+    """
+    writer = getattr(driver, "writer", None)
+    if writer is None:
+        return set()
+    writer.drain()
+    # Failed thumbnails are replaced by the full screenshots
+    thumbnails = getattr(driver, "thumbnails", None)
+    if thumbnails:
+        for image in [img for img, thumbnail in thumbnails.items() if thumbnail in writer.failed]:
+            del thumbnails[image]
+    return writer.failed
+
+
+def flush_artifacts(driver):
+    """
+    Waits for the pending artifact writes of a webdriver
+    and replaces the filenames of the failed writes in the webdriver metadata.
+    """
+    failed = flush_writer(driver)
+    if len(failed) == 0:
+        return
+    driver.images[:] = [f"screenshots{os.sep}error.png" if img in failed else img for img in driver.images]
+    driver.sources[:] = [None if src in failed else src for src in driver.sources]
+
+
 #
 # Auxiliary functions for the report generation
 #
@@ -329,7 +762,126 @@ def escape_html(text):
     return str(text).replace('<', "&lt;").replace('>', "&gt;")
 
 
-def get_table_row_tag(comment, image, source, clazz="selenium_log_comment"):
+def is_unchanged_screenshot(images, i):
+    """ Whether the i-th screenshot of a test reuses the file of the previous step. """
+    return (
+        i > 0
+        and images[i] == images[i - 1]
+        and images[i] != f"screenshots{os.sep}error.png"
+    )
+
+
+def append_table_rows(rows, comments, images, sources, thumbnails=None):
+    """
+    Appends the HTML table rows of the test steps to a list buffer.
+
+    Args:
+        rows (list[str]): The buffer.
+
+        comments (list): The comments of the test steps.
+
+        images (list[str]): The screenshots filenames.
+
+        sources (list[str]): The page sources filenames.
+
+        thumbnails (dict[str, str]): The thumbnail filenames by screenshot filename.
+    """
+    if thumbnails is None:
+        thumbnails = {}
+    for i in range(len(images)):
+        unchanged = is_unchanged_screenshot(images, i)
+        rows.append(get_table_row_tag(comments[i], images[i], sources[i], unchanged=unchanged,
+                                      thumbnail=thumbnails.get(images[i])))
+    return rows
+
+
+def append_anchors(links, images, sources, thumbnails=None, waits=None):
+    """
+    Appends the screenshot and page source anchor elements of the test steps to a list buffer.
+
+    Args:
+        links (list[str]): The buffer.
+
+        images (list[str]): The screenshots filenames.
+
+        sources (list[str]): The page sources filenames.
+
+        thumbnails (dict[str, str]): The thumbnail filenames by screenshot filename.
+
+        waits (dict[int, float]): The adaptive wait durations in seconds by screenshot position.
+    """
+    if thumbnails is None:
+        thumbnails = {}
+    if waits is None:
+        waits = {}
+    for i in range(len(images)):
+        unchanged = is_unchanged_screenshot(images, i)
+        links.append(decorate_anchors(images[i], sources[i], unchanged, thumbnails.get(images[i]), waits.get(i)))
+    return links
+
+
+def write_steps_page(report_folder, nodeid, links, rows):
+    """
+    Writes the test steps of a test in a separate HTML page in 'steps' folder under the specified folder.
+
+    Args:
+        report_folder (str): The folder destination.
+
+        nodeid (str): The test node id.
+
+        links (list[str]): The anchor elements of the test steps logged without comments.
+
+        rows (list[str]): The table rows of the test steps logged with comments.
+
+    Returns:
+        str: The filename for the anchor link, or None if the page couldn't be written.
+    """
+    folder = ""
+    if report_folder is not None and report_folder != '':
+        folder = f"{report_folder}{os.sep}"
+    name = re.sub(r"[^\w.-]+", "_", nodeid)[-100:]
+    digest = hashlib.blake2b(nodeid.encode("utf-8"), digest_size=4).hexdigest()
+    link = f"steps{os.sep}{name}-{digest}.html"
+    filename = folder + link
+    title = escape_html(nodeid)
+    try:
+        pathlib.Path(filename).parent.mkdir(parents=True, exist_ok=True)
+        with open(filename, 'w', encoding="utf-8") as f:
+            f.write(
+                "<!DOCTYPE html>\n<html>\n<head>\n"
+                '<meta charset="utf-8">\n'
+                f"<title>{title}</title>\n"
+                # Screenshot and page source links are relative to the report folder
+                '<base href="../">\n'
+                f"<style>\n{get_stylesheet()}</style>\n"
+                f"</head>\n<body>\n<h2>{title}</h2>\n"
+            )
+            f.writelines(links)
+            if len(rows) > 0:
+                f.write('<table style="width: 100%;">')
+                f.writelines(rows)
+                f.write("</table>")
+            f.write("\n</body>\n</html>\n")
+    except Exception as e:
+        trace = traceback.format_exc()
+        logger.append_driver_error(f"Error writing '{filename}' file. The test steps are kept in the report",
+                                   e, trace)
+        return None
+    return link
+
+
+@functools.lru_cache(maxsize=1)
+def get_stylesheet():
+    """ Returns the content of the plugin CSS file. """
+    resources_path = pathlib.Path(__file__).parent.joinpath("resources")
+    return pathlib.Path(resources_path, "style.css").read_text(encoding="utf-8")
+
+
+# HTML template of a test step table row
+row_template = '<tr><td>{0}</td><td class="selenium_td"><div class="selenium_td_div">{1}</div></td></tr>'
+
+
+def get_table_row_tag(comment, image, source, clazz="selenium_log_comment", unchanged=False, thumbnail=None):
     """
     Returns the HTML table row of a test step.
     
@@ -341,11 +893,17 @@ def get_table_row_tag(comment, image, source, clazz="selenium_log_comment"):
         source (str): The page source anchor element.
         
         clazz (str): The CSS class to apply.
+
+        unchanged (bool): Whether the screenshot is identical to the one of the previous step.
+
+        thumbnail (str): The thumbnail filename of the screenshot, if any.
     
     Returns:
         str: The <tr> element.
     """
-    image = decorate_screenshot(image)
+    image = decorate_screenshot(image, thumbnail=thumbnail)
+    if unchanged:
+        image += decorate_unchanged()
     if type(comment) == dict:
         comment = decorate_description(comment)
     elif type(comment) == str:
@@ -353,20 +911,8 @@ def get_table_row_tag(comment, image, source, clazz="selenium_log_comment"):
     else:
         comment = ""
     if source is not None:
-        source = decorate_page_source(source)
-        return (
-            f"<tr>"
-            f"<td>{comment}</td>"
-            f'<td class="selenium_td"><div class="selenium_td_div">{image}<br>{source}</div></td>'
-            f"</tr>"
-        )
-    else:
-        return (
-            f"<tr>"
-            f"<td>{comment}</td>"
-            f'<td class="selenium_td"><div class="selenium_td_div">{image}</div></td>'
-            "</tr>"
-        )
+        image = f"{image}<br>{decorate_page_source(source)}"
+    return row_template.format(comment, image)
 
 
 def decorate_description(description):
@@ -384,23 +930,43 @@ def decorate_description(description):
         description['locator'] = None
     if 'attributes' not in description:
         description['attributes'] = None
+    if 'wait' not in description:
+        description['wait'] = None
 
     if description['comment'] is not None:
         return decorate_label(description['comment'], "selenium_log_comment")
-    label = decorate_label(description['action'], "selenium_log_action")
+    label = [decorate_label(description['action'], "selenium_log_action")]
     if description['url'] is not None:
-        label += " " + decorate_label(description['url'], "selenium_log_target")
+        label.append(" " + decorate_label(description['url'], "selenium_log_target"))
     else:
         if description['value'] is not None:
-            label += " " + decorate_quote() + description['value'] + decorate_quote()
+            label.append(f" {quote}{description['value']}{quote}")
         if description['locator'] is not None or description['attributes'] is not None:
-            label += "<br/><br>"
+            label.append("<br/><br>")
             if description['locator'] is not None:
-                locator = description['locator'].replace('"', decorate_quote())
-                label += "Locator: " + decorate_label(locator, "selenium_log_target") + "<br/><br>"
+                locator = description['locator'].replace('"', quote)
+                label.append("Locator: " + decorate_label(locator, "selenium_log_target") + "<br/><br>")
             if description['attributes'] is not None:
-                label += "Attributes: " + decorate_label(description['attributes'], "selenium_log_target")
-    return decorate_label(label, "selenium_log_description")
+                label.append("Attributes: " + decorate_label(description['attributes'], "selenium_log_target"))
+    if description['wait'] is not None:
+        label.append("<br/><br>" + "Wait: " + decorate_label(f"{description['wait']:.3f}s", "selenium_log_target"))
+    return decorate_label("".join(label), "selenium_log_description")
+
+
+def decorate_overhead(timings, steps, clazz="selenium_log_overhead"):
+    """
+    Returns the HTML representation of the plugin overhead of a test.
+
+    Args:
+        timings (dict[str, float]): The overhead per category in seconds.
+
+        steps (int): The number of test steps.
+    """
+    total = sum(timings.values())
+    label = f"Plugin overhead: {total:.3f}s for {steps} step(s)"
+    if len(timings) > 0:
+        label += f" ({instrumentation.format_timings(timings)})"
+    return f'<p class="{clazz}">{label}</p>'
 
 
 def decorate_label(label, clazz):
@@ -418,24 +984,51 @@ def decorate_label(label, clazz):
     return f'<span class="{clazz}">{label}</span>'
 
 
-def decorate_anchors(image, source):
+def decorate_anchors(image, source, unchanged=False, thumbnail=None, wait=None):
     """ Applies CSS style to a screenshot and page source anchor elements. """
-    image = decorate_screenshot(image)
+    image = decorate_screenshot(image, thumbnail=thumbnail)
+    labeled = unchanged or wait is not None
+    if unchanged:
+        image += decorate_unchanged()
+    if wait is not None:
+        image += decorate_wait(wait)
     if source is not None:
         source = decorate_page_source(source)
         return f'<div class="selenium_div">{image}<br>{source}</div>'
+    elif labeled:
+        return f'<div class="selenium_div">{image}</div>'
     else:
         return image
 
 
-def decorate_screenshot(filename, clazz="selenium_log_img"):
-    """ Applies CSS style to a screenshot anchor element. """
-    return f'<a href="{filename}" target="_blank"><img src ="{filename}" class="{clazz}"></a>'
+def decorate_screenshot(filename, clazz="selenium_log_img", thumbnail=None):
+    """
+    Applies CSS style to a screenshot anchor element.
+    The thumbnail, if any, is displayed instead of the screenshot.
+    """
+    src = thumbnail if thumbnail is not None else filename
+    return f'<a href="{filename}" target="_blank"><img src ="{src}" class="{clazz}" loading="lazy"></a>'
+
+
+def decorate_steps_page(filename, steps, clazz="selenium_steps_page"):
+    """ Applies CSS style to the anchor element of a test steps page. """
+    return f'<a href="{filename}" target="_blank" class="{clazz}">[{steps} test step(s)]</a>'
 
 
 def decorate_page_source(filename, clazz="selenium_page_src"):
     """ Applies CSS style to a page source anchor element. """
-    return f'<a href="{filename}" target="_blank" class="{clazz}">[page source]</a>'
+    label = "[page source diff]" if ".diff" in filename else "[page source]"
+    return f'<a href="{filename}" target="_blank" class="{clazz}">{label}</a>'
+
+
+def decorate_unchanged(clazz="selenium_log_unchanged"):
+    """ Applies CSS style to the label of a screenshot identical to the previous one. """
+    return f'<br><span class="{clazz}">[unchanged]</span>'
+
+
+def decorate_wait(wait, clazz="selenium_log_wait"):
+    """ Applies CSS style to the label of the adaptive wait duration of a test step. """
+    return f'<br><span class="{clazz}">[wait {wait:.3f}s]</span>'
 
 
 def decorate_quote():
@@ -443,6 +1036,10 @@ def decorate_quote():
     return decorate_label('"', "selenium_log_quote")
 
 
+# Decorated quotation of test step values
+quote = decorate_quote()
+
+
 def log_error_message(report, item, message):
     """ Appends error message in log file and in stderr section of a test report. """
     logger.append_report_error(item.location[0], item.location[2], message)
@@ -463,6 +1060,51 @@ def log_error_message(report, item, message):
         pass
 
 
+#
+# Counting of the WebDriver commands issued by the plugin
+#
+def install_commands_counter(driver):
+    """
+    Wraps the 'execute' method of a webdriver to count the WebDriver commands
+    issued while the plugin is active.
+    """
+    setattr(driver, "plugin_commands", 0)
+    setattr(driver, "plugin_depth", 0)
+    if getattr(driver, "commands_counter", False):
+        return
+    execute = driver.execute
+
+    def wrapped(driver_command, params=None):
+        if driver.plugin_depth > 0:
+            driver.plugin_commands += 1
+        return execute(driver_command, params)
+
+    driver.execute = wrapped
+    setattr(driver, "commands_counter", True)
+
+
+@contextlib.contextmanager
+def plugin_commands(driver):
+    """ Context in which the WebDriver commands are counted as issued by the plugin. """
+    if not hasattr(driver, "plugin_depth"):
+        yield
+        return
+    driver.plugin_depth += 1
+    try:
+        yield
+    finally:
+        driver.plugin_depth -= 1
+
+
+def plugin_commands_counter(func):
+    """ Decorator counting the WebDriver commands issued by an event listener method. """
+    def wrapped(*args, **kwargs):
+        # The webdriver is the last argument of the event listener methods
+        with plugin_commands(args[-1]):
+            return func(*args, **kwargs)
+    return wrapped
+
+
 #
 # Function decorators to handle exceptions.
 #
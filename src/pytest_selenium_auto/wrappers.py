@@ -1,10 +1,16 @@
 from selenium.webdriver.support.event_firing_webdriver import EventFiringWebElement, EventFiringWebDriver
 from selenium.webdriver.remote.webelement import By
 from selenium.webdriver.support.select import Select
-from . import utils
+import collections
+from . import (
+    step_log,
+    utils,
+)
 
 
-def wrap_driver(driver, screenshots, images, sources, comments, report_folder, log_attributes, log_page_source):
+def wrap_driver(driver, screenshots, images, sources, comments, report_folder, log_attributes, log_page_source,
+                writer=None, screenshot_settings=None, deduplicate=False, artifact_store="flat",
+                page_source_settings=None, buffer_size=0, thumbnail_width=0):
     """
     Adds metadata to a webdriver.
     
@@ -24,6 +30,20 @@ def wrap_driver(driver, screenshots, images, sources, comments, report_folder, l
         log_attributes (bool): Whether to log WebElement DOM attributes.
         
         log_page_source (bool): Whether to log web page sources.
+
+        writer (ArtifactWriter): The background writer of screenshots and page sources.
+
+        screenshot_settings (dict): The screenshot format, quality, maximum width and grayscale settings.
+
+        deduplicate (bool): Whether to reuse the previous screenshot file when the new screenshot is identical.
+
+        artifact_store (str): The screenshot and page source file layout: 'flat' or 'content'.
+
+        page_source_settings (dict): The page source compression and diff settings.
+
+        buffer_size (int): The number of test steps kept in memory with the 'buffer' screenshot strategy.
+
+        thumbnail_width (int): The width in pixels of the screenshot thumbnails. 0 means no thumbnails.
     """
     setattr(driver, "images", images)
     setattr(driver, "sources", sources)
@@ -32,6 +52,18 @@ def wrap_driver(driver, screenshots, images, sources, comments, report_folder, l
     setattr(driver, "report_folder", report_folder)
     setattr(driver, "log_attributes", log_attributes)
     setattr(driver, "log_page_source", log_page_source)
+    setattr(driver, "writer", writer)
+    setattr(driver, "screenshot_settings", screenshot_settings)
+    setattr(driver, "deduplicate", deduplicate)
+    setattr(driver, "last_screenshot", None)
+    setattr(driver, "artifact_store", artifact_store)
+    setattr(driver, "page_source_settings", page_source_settings)
+    setattr(driver, "last_source", None)
+    setattr(driver, "buffer", collections.deque(maxlen=max(buffer_size, 1)))
+    setattr(driver, "thumbnail_width", thumbnail_width)
+    setattr(driver, "thumbnails", {})
+    setattr(driver, "waits", {})
+    utils.install_commands_counter(driver)
 
 
 def wrap_element(element, by, value, description=None):
@@ -66,23 +98,23 @@ class CustomEventFiringWebDriver(EventFiringWebDriver):
         return elem
 
     def find_elements(self, by=By.ID, value=None, description=None):
-        elems = super().find_elements(by, value)
-        for elem in elems:
-            wrap_element(elem.wrapped_element, by, value, description)
-        return elems
+        return _find_elements(self, self._driver, self._driver, by, value, description)
 
     def log_screenshot(self, comment=""):
         driver = self.wrapped_driver
         if comment is None:
             comment = ""
         if driver.screenshots in ("all", "manual"):
-            index = utils.counter()
-            driver.images.append(utils.save_screenshot(driver, driver.report_folder, index))
-            driver.comments.append({'comment': utils.escape_html(comment).replace('\n', "<br>")})
-            if driver.log_page_source:
-                driver.sources.append(utils.save_page_source(driver, driver.report_folder, index))
-            else:
-                driver.sources.append(None)
+            with utils.plugin_commands(driver):
+                step_log.start_step(driver)
+                index = utils.counter()
+                driver.images.append(utils.save_screenshot(driver, driver.report_folder, index))
+                driver.comments.append({'comment': utils.escape_html(comment).replace('\n', "<br>")})
+                if driver.log_page_source:
+                    driver.sources.append(utils.save_page_source(driver, driver.report_folder, index))
+                else:
+                    driver.sources.append(None)
+                step_log.log_step(driver, driver.comments[-1], driver.images[-1], driver.sources[-1])
 
 
 class CustomEventFiringWebElement(EventFiringWebElement):
@@ -98,11 +130,11 @@ class CustomEventFiringWebElement(EventFiringWebElement):
         return elem
 
     def find_elements(self, by=By.ID, value=None):
-        elems = super().find_elements(by, value)
         description = getattr(self.wrapped_element.wrapped_element, "description", None)
-        for elem in elems:
-            wrap_element(elem.wrapped_element, by, value, description)
-        return elems
+        element = self._webelement
+        while isinstance(element, EventFiringWebElement):
+            element = element.wrapped_element
+        return _find_elements(self._ef_driver, element, self._driver, by, value, description)
 
 
 class CustomSelect(Select):
@@ -111,3 +143,127 @@ class CustomSelect(Select):
     def __init__(self, webelement, driver) -> None:
         elem = CustomEventFiringWebElement(webelement, driver)
         super().__init__(elem)
+
+
+class WebElementList(list):
+    """
+    Result of find_elements.
+
+    List of the webelements returned by the webdriver, sharing the same locator.
+    The webelements are wrapped in EventFiringWebElement objects only when they are accessed.
+    The methods exposing all the webelements at once wrap them all first.
+    """
+
+    def __init__(self, elements, locator, ef_driver):
+        """
+        Args:
+            elements (list[WebElement | EventFiringWebElement]): The webelements.
+
+            locator (tuple[By, str, str]): The locator strategy, the locator value and the description pattern.
+
+            ef_driver (EventFiringWebDriver): The event firing webdriver.
+        """
+        super().__init__(elements)
+        self._locator = locator
+        self._ef_driver = ef_driver
+
+    def _wrap(self, index):
+        """ Wraps the webelement at the given index, if not already wrapped, and returns it. """
+        elem = super().__getitem__(index)
+        if not isinstance(elem, EventFiringWebElement):
+            wrap_element(elem, *self._locator)
+            elem = EventFiringWebElement(elem, self._ef_driver)
+            super().__setitem__(index, elem)
+        return elem
+
+    def _wrap_all(self):
+        for i in range(len(self)):
+            self._wrap(i)
+        return self
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return WebElementList(super().__getitem__(index), self._locator, self._ef_driver)
+        return self._wrap(index)
+
+    def __iter__(self):
+        i = 0
+        while i < len(self):
+            yield self._wrap(i)
+            i += 1
+
+    def __reversed__(self):
+        return reversed(list(self))
+
+    def __contains__(self, value):
+        return super(WebElementList, self._wrap_all()).__contains__(value)
+
+    def __eq__(self, other):
+        if isinstance(other, WebElementList):
+            other._wrap_all()
+        return super(WebElementList, self._wrap_all()).__eq__(other)
+
+    def __ne__(self, other):
+        result = self.__eq__(other)
+        return result if result is NotImplemented else not result
+
+    __hash__ = None
+
+    def __add__(self, other):
+        return list(self) + list(other)
+
+    def __radd__(self, other):
+        return list(other) + list(self)
+
+    def __mul__(self, count):
+        return list(self) * count
+
+    __rmul__ = __mul__
+
+    def copy(self):
+        return self[:]
+
+    def pop(self, index=-1):
+        self._wrap(index)
+        return super().pop(index)
+
+    def index(self, value, *args):
+        return super(WebElementList, self._wrap_all()).index(value, *args)
+
+    def count(self, value):
+        return super(WebElementList, self._wrap_all()).count(value)
+
+    def remove(self, value):
+        super(WebElementList, self._wrap_all()).remove(value)
+
+    def sort(self, *, key=None, reverse=False):
+        super(WebElementList, self._wrap_all()).sort(key=key, reverse=reverse)
+
+    def __repr__(self):
+        return f"WebElementList({self._locator[0]}={self._locator[1]!r}, {len(self)} element(s))"
+
+
+def _find_elements(ef_driver, target, driver, by, value, description):
+    """
+    Finds webelements, firing the find events, without wrapping the result eagerly.
+
+    Args:
+        ef_driver (EventFiringWebDriver): The event firing webdriver.
+
+        target (WebDriver | WebElement): The webdriver or webelement to search from.
+
+        driver (WebDriver): The webdriver passed to the event listener.
+
+    Returns:
+        WebElementList: The webelements.
+    """
+    listener = ef_driver._listener
+    listener.before_find(by, value, driver)
+    try:
+        elems = target.find_elements(by, value)
+    except Exception as exc:
+        listener.on_exception(exc, driver)
+        raise
+    listener.after_find(by, value, driver)
+    return WebElementList(elems, (by, value, description), ef_driver)
+